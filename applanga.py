@@ -2,26 +2,47 @@
 
 import click
 from lib import constants
+from lib import output
+from lib import profiling
+from lib import metrics
+from lib import tracing
+from lib import lazy_group
 import commands
 
-@click.group()
+@click.group(cls=lazy_group.LazyGroup, lazy_commands=commands.COMMANDS)
 @click.version_option(constants.VERSION_NUMBER)
 @click.option('--debug/--no-debug', default=False)
 @click.option('--disable-cert-verification', default=False, is_flag=True)
+@click.option('--connection-pool-size', default=constants.CONNECTION_POOL_SIZE, type=click.IntRange(min=1), help='Maximum number of connections kept open to the Applanga API.')
+@click.option('--max-attempts', default=None, type=click.IntRange(min=1), help='How often a failed request is sent at most. Overrides max_attempts of the retry config.')
+@click.option('--connect-timeout', default=constants.CONNECT_TIMEOUT, type=click.FloatRange(min=0, min_open=True), help='Seconds to wait for a connection to the Applanga API.')
+@click.option('--read-timeout', default=constants.READ_TIMEOUT, type=click.FloatRange(min=0, min_open=True), help='Seconds to wait for the Applanga API to send data.')
+@click.option('--profile', is_flag=True, help='Show how much time the phases of the run took, like config load, file discovery, transfers and writes.')
+@click.option('--profile-output', default=None, type=click.Path(dir_okay=False, writable=True), help='Also write a profile of all function calls to this file.')
+@click.option('--profile-format', default='pstats', type=click.Choice(profiling.PROFILE_FORMATS), help='Format of --profile-output: pstats for cProfile data or collapsed for flamegraph stacks.')
+@click.option('--metrics-json', default=None, type=click.Path(dir_okay=False, writable=True), help='Write a record of every request to Applanga API and aggregate throughput and latency numbers to this JSON file.')
+@click.option('--trace', 'trace_path', default=None, type=click.Path(dir_okay=False, writable=True), help='Write the command, targets, languages, requests and file writes of the run as OpenTelemetry spans in JSON lines to this file.')
 @click.pass_context
-def cli(ctx, debug, disable_cert_verification):
+def cli(ctx, debug, disable_cert_verification, connection_pool_size, max_attempts, connect_timeout, read_timeout, profile, profile_output, profile_format, metrics_json, trace_path):
     ctx.obj['DEBUG'] = debug
     ctx.obj['disable-cert-verification'] = disable_cert_verification
+    ctx.obj['connection-pool-size'] = connection_pool_size
+    ctx.obj['max-attempts'] = max_attempts
+    ctx.obj['connect-timeout'] = connect_timeout
+    ctx.obj['read-timeout'] = read_timeout
 
+    if profile or profile_output:
+        profiler = profiling.start(profile_output, profile_format)
+        ctx.call_on_close(lambda: output.show_profile(profiler))
+
+    if metrics_json:
+        recorder = ctx.obj['metrics'] = metrics.MetricsRecorder()
+        ctx.call_on_close(lambda: recorder.write(metrics_json))
+
+    if trace_path:
+        tracing.start(trace_path, ctx.invoked_subcommand, {'applanga.cli.version': constants.VERSION_NUMBER})
+        ctx.call_on_close(tracing.stop)
 
-# Add all the commands we support
-cli.add_command(commands.config.config)
-cli.add_command(commands.init.init)
-cli.add_command(commands.pull.pull)
-cli.add_command(commands.push.push)
-cli.add_command(commands.updateSettingsfiles.updateSettingsfiles)
-cli.add_command(commands.pullSource.pullSource)
-cli.add_command(commands.pushTarget.pushTarget)
 
 # Initialize the command line tool
 if __name__ == '__main__':
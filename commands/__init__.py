@@ -1,7 +1,12 @@
-from commands import config
-from commands import init
-from commands import pull
-from commands import push
-from commands import updateSettingsfiles
-from commands import pullSource
-from commands import pushTarget
+# The command modules are only imported when their command gets used, see
+# lib/lazy_group.py. Maps the command name to the import path of the command.
+COMMANDS = {
+    'config': 'commands.config.config',
+    'init': 'commands.init.init',
+    'pull': 'commands.pull.pull',
+    'push': 'commands.push.push',
+    'updateSettingsfiles': 'commands.updateSettingsfiles.updateSettingsfiles',
+    'pullsource': 'commands.pullSource.pullSource',
+    'pushtarget': 'commands.pushTarget.pushTarget',
+    'sync': 'commands.sync.sync'
+}
@@ -1,11 +1,17 @@
 import click
-import requests
 import json
 
 from lib import api
 from lib import config_file
 from lib import output
 from lib import options
+from lib import workers
+from lib import connection
+from lib import lock_file
+from lib import deadline
+from lib import tracing
+from lib import work_plan
+from lib import sharding
 
 
 def filter_request_languages_for_target(
@@ -131,8 +137,65 @@ def filter_request_languages_for_target(
     is_flag=True,
     help='Fail immediately on any validation or download error (exit code 1).'
 )
-def pull(ctx, tags, languages, fail_on_error):
+@click.option(
+    '--jobs',
+    type=click.IntRange(min=1),
+    default=None,
+    help='Number of files to download in parallel. Can also be set via "jobs" in the pull block of the config file (default 1).'
+)
+@click.option(
+    '--full',
+    is_flag=True,
+    help='Download and write all files, even if they did not change since the last pull.'
+)
+@click.option(
+    '--fsync',
+    is_flag=True,
+    help='Flush every downloaded file to disk before it replaces the existing one.'
+)
+@click.option(
+    '--deadline',
+    'deadline_seconds',
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help='Maximum number of seconds the whole pull may take. Downloads which did not finish in time are cancelled.'
+)
+@click.option(
+    '--bulk',
+    is_flag=True,
+    help='Download all languages of a target with a single request if the server supports it.'
+)
+@click.option(
+    '--plan',
+    is_flag=True,
+    help='Only print the files which would be downloaded, one per target and language with the resolved path, as JSON.'
+)
+@click.option(
+    '--shard',
+    type=sharding.SHARD,
+    default=None,
+    help='Only download the files of one of N shards, e.g. 2/4. Every file is downloaded by exactly one of the shards 1/4 to 4/4.'
+)
+@click.option(
+    '--shard-by',
+    type=click.Choice(sharding.SHARD_BY),
+    default='count',
+    help='Balance the shards by the number of files (default) or by the file sizes of --shard-sizes.'
+)
+@click.option(
+    '--shard-sizes',
+    type=sharding.SHARD_SIZES,
+    default=None,
+    help='Plan written by "pull --plan" with the file sizes for --shard-by size. All shards need the same file to split the files the same way.'
+)
+def pull(ctx, tags, languages, fail_on_error, jobs, full, fsync, deadline_seconds, bulk, plan, shard, shard_by, shard_sizes):
+    if shard_by == 'size' and shard_sizes is None:
+        # Sizes of the own lock file differ between machines and so would the shards
+        raise click.UsageError('--shard-by size needs the sizes of all files from --shard-sizes.', ctx)
+
+    output.start_plan(ctx, plan)
     output.showCommandHeader('pull', ctx)
+    deadline.start(ctx, deadline_seconds)
 
     # Tag parsing
     tags_valid, parsed_tags = options.parse_and_validate_tags(tags)
@@ -171,23 +234,23 @@ def pull(ctx, tags, languages, fail_on_error):
         output.abort_if_fail_on_error(ctx, fail_on_error)
         return
 
+    if parsed_languages:
+        # Languages given with --languages which are not part of the project
+        # get skipped with a warning, see filter_request_languages_for_target
+        needs_app_languages = True
+    else:
+        # Only the <language> placeholder needs the languages of the project
+        needs_app_languages = any('language' not in target and '<language>' in target['path'] for target in config_file_data['app']['pull']['target'])
+
     all_app_languages = []
-    for target in config_file_data['app']['pull']['target']:
-        if 'language' not in target:
-            if '<language>' not in target['path']:
-                # If also no placeholder is defined then there is no need to
-                # query languages from API
-                continue
-
-            try:
-                all_app_languages = api.getAllAppLanguages(ctx, projectVersion)
-            except api.ApplangaRequestException as e:
-                click.echo('Result: "Error"')
-                click.secho('There was a problem getting the app languages:\n%s\n' % str(e), err=True, fg='red')
-                output.abort_if_fail_on_error(ctx, fail_on_error)
-                return
-
-            break
+    if needs_app_languages:
+        try:
+            all_app_languages = api.getAllAppLanguages(ctx, projectVersion)
+        except api.ApplangaRequestException as e:
+            click.echo('Result: "Error"')
+            click.secho('There was a problem getting the app languages:\n%s\n' % str(e), err=True, fg='red')
+            output.abort_if_fail_on_error(ctx, fail_on_error)
+            return
     target_files = config_file_data['app']['pull']['target']
 
     # Filter if parsed_tags is set
@@ -206,6 +269,211 @@ def pull(ctx, tags, languages, fail_on_error):
             output.abort_if_fail_on_error(ctx, fail_on_error)
             return
 
+    jobs = workers.getJobCount(jobs, config_file_data['app']['pull'])
+    connection.setJobCount(ctx, jobs)
+    downloads = iter_download_jobs(target_files, parsed_languages, all_app_languages, projectVersion)
+
+    # The lock file remembers the state of the last pull so unchanged files can be skipped.
+    # With --full everything gets downloaded again but the lock file is still updated.
+    lock = lock_file.read()
+
+    if shard is not None:
+        all_downloads = list(downloads)
+        downloads = select_download_shard(all_downloads, shard, shard_sizes if shard_by == 'size' else None)
+        if not plan:
+            click.echo(sharding.getDescription(shard, count_download_jobs(downloads), count_download_jobs(all_downloads)))
+
+    if plan:
+        plan_data = work_plan.getPullPlan(downloads, lock, full, projectVersion)
+        if shard is not None:
+            plan_data['shard'] = work_plan.getShardInfo(shard, count_download_jobs(all_downloads))
+        output.show_plan(ctx, plan_data)
+        return
+
+    try:
+        run_downloads(ctx, downloads, jobs, lock, full, fsync, fail_on_error, bulk)
+    finally:
+        lock.save()
+
+
+
+def run_downloads(ctx, downloads, jobs, lock, full, fsync, fail_on_error, bulk=False):
+    """
+    Downloads all files with the given number of parallel jobs and prints the results in order.
+
+    Jobs of iter_download_jobs with an 'error' are not downloaded, their error is
+    shown at their position in the results.
+
+    Once the deadline of the command passed all remaining downloads get cancelled
+    and a summary of the finished and cancelled files is shown.
+    """
+    finished = 0
+    cancelled = 0
+    if bulk:
+        results = iter_bulk_download_results(ctx, downloads, jobs, lock, full, fsync)
+    else:
+        results = workers.runOrdered(lambda file_data: download_job(file_data, lambda: api.downloadFileIfChanged(ctx, file_data, lock, force=full, fsync=fsync)), downloads, jobs)
+
+    for file_data, result, error in results:
+        click.echo('\nDownload :  %s\nLanguage :  %s' % (file_data['path'], file_data['language']))
+        click.echo('=' * 60)
+
+        if error is None:
+            file_path, written = result
+            finished += 1
+            click.echo('Result: "Success"')
+            if written:
+                click.echo('Wrote file: %s' % file_path)
+            else:
+                click.echo('File unchanged: %s' % file_path)
+
+        elif isinstance(error, api.ApplangaDeadlineException):
+            cancelled += 1
+            click.echo('Result: "Cancelled"')
+
+        elif isinstance(error, config_file.ApplangaConfigFileNotValidException):
+            click.echo('Result: "Error"')
+            click.secho('%s\n' % str(error), err=True, fg='red')
+            output.abort_if_fail_on_error(ctx, fail_on_error)
+
+        elif isinstance(error, api.ApplangaConnectionException):
+            click.secho(str(error), err=True, fg='red')
+            output.abort_if_fail_on_error(ctx, fail_on_error)
+            return
+
+        elif isinstance(error, api.ApplangaRequestException):
+            click.echo('Result: "Error"')
+            click.secho('There was a problem with downloading file:\n%s\n' % str(error), err=True, fg='red')
+            if str(error).startswith('API response: Error: Tag with name'):
+                click.echo('You might need to push your content in order to have the Tag created first')
+            output.abort_if_fail_on_error(ctx, fail_on_error)
+            return
+
+        else:
+            raise error
+
+    if cancelled:
+        output.show_deadline_summary(ctx, finished, cancelled)
+        output.abort_if_fail_on_error(ctx, fail_on_error)
+
+
+
+def iter_bulk_download_results(ctx, downloads, jobs, lock, full, fsync):
+    """
+    Downloads the languages of each target together and yields the results per file like workers.runOrdered.
+    """
+    batches = iter_download_batches(ctx, downloads)
+    for batch, results, error in workers.runOrdered(lambda batch: download_job(batch[0], lambda: api.downloadFiles(ctx, batch, lock, force=full, fsync=fsync), batch), batches, jobs):
+        if error is not None:
+            results = [(file_data, None, error) for file_data in batch]
+
+        for file_data, result, file_error in results:
+            yield file_data, result, file_error
+
+
+
+def iter_download_batches(ctx, downloads):
+    """
+    Groups the downloads of iter_download_jobs which only differ in the language.
+
+    Once the server declined a bulk download every file is downloaded on its own again.
+    """
+    batch = []
+    for file_data in downloads:
+        if batch and ('error' in file_data or not api.isBulkDownloadSupported(ctx) or not is_same_target(batch[0], file_data)):
+            yield batch
+            batch = []
+        batch.append(file_data)
+
+    if batch:
+        yield batch
+
+
+
+def download_job(file_data, download, files_data=None):
+    """
+    Runs the download of a job of iter_download_jobs, see trace_download.
+
+    Jobs with an 'error' raise it as ApplangaConfigFileNotValidException without downloading anything.
+    """
+    if 'error' in file_data:
+        raise config_file.ApplangaConfigFileNotValidException(file_data['error'])
+    return trace_download(files_data or [file_data], download)
+
+
+
+def trace_download(files_data, download):
+    """
+    Runs the download of one or more languages of the same target inside a span for the languages.
+
+    The span is a child of the target span of iter_download_jobs which ends
+    once all downloads of the target are done.
+    """
+    target_span = files_data[0].get('trace_span')
+    attributes = {
+        'applanga.language': ','.join(file_data['language'] for file_data in files_data),
+        'applanga.file.path': files_data[0]['path']
+    }
+
+    try:
+        with tracing.span('language', attributes, parent=target_span):
+            return download()
+    finally:
+        if target_span is not None:
+            for file_data in files_data:
+                target_span.release()
+
+
+
+def is_same_target(file_data, other_file_data):
+    """
+    Checks if two downloads are for the same target block in different languages.
+    """
+    return dict(file_data, language=None) == dict(other_file_data, language=None)
+
+
+
+def select_download_shard(downloads, shard, sizes=None, get_size=None):
+    """
+    Returns the downloads of iter_download_jobs which one shard of the pull handles, see sharding.selectItems.
+
+    The shards are balanced by the sizes of the --shard-sizes plan if given,
+    every shard reads the same plan so they all split the files the same way.
+    Otherwise get_size can return the size of a download.
+    """
+    if sizes is not None:
+        get_size = lambda file_data: sizes.get((file_data['path'], file_data['language']))
+    jobs = [file_data for file_data in downloads if 'error' not in file_data]
+    selected = sharding.selectItems(jobs, shard, lambda file_data: '%s\n%s' % (file_data['path'], file_data['language']), get_size)
+
+    # Target spans wait for all their languages, the ones of other shards are done right away
+    selected_ids = set(id(file_data) for file_data in selected)
+    for file_data in jobs:
+        if id(file_data) not in selected_ids and 'trace_span' in file_data:
+            file_data['trace_span'].release()
+
+    # Every shard reports the broken target blocks so each of them fails with --fail-on-error
+    return [file_data for file_data in downloads if 'error' in file_data or id(file_data) in selected_ids]
+
+
+
+def count_download_jobs(downloads):
+    """
+    Returns the number of files of the downloads without the target blocks which can not be downloaded.
+    """
+    return len([file_data for file_data in downloads if 'error' not in file_data])
+
+
+
+def iter_download_jobs(target_files, parsed_languages, all_app_languages, projectVersion):
+    """
+    Resolves the target blocks into single downloads, one per target and language.
+
+    Every job is a copy of the target block with language and projectVersion set.
+    Target blocks which can not be downloaded are yielded as job with 'error'
+    set instead, so the problem gets reported in order with the downloads
+    even though workers.runOrdered resolves jobs ahead of the results.
+    """
     for target in target_files:
 
         if 'language' in target and '<language>' in target['path']:
@@ -218,20 +486,13 @@ def pull(ctx, tags, languages, fail_on_error):
             # Language placeholder is defined in path so download all languages
             request_languages = list(all_app_languages)
         else:
-            # No language defined so error
-            click.echo('\nDownload :  %s\nLanguage :  %s' % (target['path'], 'missing'))
-            click.echo('=' * 60)
-            click.echo('Result: "Error"')
-            click.secho(
-                'You either need to use the <language> wildcard inside the path string or '
-                'set it explicitly per file via the "language" property.\n',
-                err=True,
-                fg='red'
-            )
-            output.abort_if_fail_on_error(
-                ctx,
-                fail_on_error
-            )
+            # No language defined so error, it gets reported when the jobs before it are done
+            yield {
+                'path': target['path'],
+                'language': 'missing',
+                'error': 'You either need to use the <language> wildcard inside the path string or '
+                         'set it explicitly per file via the "language" property.'
+            }
             continue
 
         # Remove all the languages on the exclude list
@@ -255,29 +516,20 @@ def pull(ctx, tags, languages, fail_on_error):
         if not request_languages:
             continue
 
-        target['projectVersion'] = projectVersion
+        # The target span ends once the downloads of all its languages are done, see trace_download
+        target_span = tracing.startSpan('target', {
+            'applanga.file.path': target['path'],
+            'applanga.tag': target.get('tag'),
+            'applanga.languages': request_languages
+        })
 
         # Go through all the languages that should be downloaded
         for language in request_languages:
-            target['language'] = language
-
-            click.echo('\nDownload :  %s\nLanguage :  %s' % (target['path'], language))
-            click.echo('=' * 60)
-
-            try:
-                file_written = api.downloadFile(ctx, target)
-                click.echo('Result: "Success"')
-                click.echo('Wrote file: %s' % file_written)
-
-            except api.ApplangaConnectionException as e:
-                click.secho(str(e), err=True, fg='red')
-                output.abort_if_fail_on_error(ctx, fail_on_error)
-                return
-
-            except api.ApplangaRequestException as e:
-                click.echo('Result: "Error"')
-                click.secho('There was a problem with downloading file:\n%s\n' % str(e), err=True, fg='red')
-                if str(e).startswith('API response: Error: Tag with name'):
-                    click.echo('You might need to push your content in order to have the Tag created first')
-                output.abort_if_fail_on_error(ctx, fail_on_error)
-                return
+            file_data = dict(target)
+            file_data['language'] = language
+            file_data['projectVersion'] = projectVersion
+            if tracing.isEnabled():
+                file_data['trace_span'] = target_span.hold()
+            yield file_data
+
+        target_span.release()
@@ -3,6 +3,9 @@ from lib import api
 from lib import config_file
 from lib import output
 from lib import options
+from lib import tracing
+from lib import sharding
+from commands import pull
 
 
 @click.command()
@@ -18,7 +21,19 @@ from lib import options
     is_flag=True,
     help='Fail immediately on any validation or download error (exit code 1).'
 )
-def pullSource(ctx, tags, fail_on_error):
+@click.option(
+    '--shard',
+    type=sharding.SHARD,
+    default=None,
+    help='Only download the files of one of N shards, e.g. 2/4. Every file is downloaded by exactly one of the shards 1/4 to 4/4.'
+)
+@click.option(
+    '--shard-by',
+    type=click.Choice(sharding.SHARD_BY),
+    default='count',
+    help='Balance the shards by the number of files (default) or by the size of the source files they replace.'
+)
+def pullSource(ctx, tags, fail_on_error, shard, shard_by):
     output.showCommandHeader('pullSource', ctx)
 
     is_valid, parsed_tags = options.parse_and_validate_tags(tags)
@@ -91,6 +106,49 @@ def pullSource(ctx, tags, fail_on_error):
             return
         
     
+    downloads = iter_source_downloads(source_files, all_app_languages, projectVersion)
+    if shard is not None:
+        all_downloads = list(downloads)
+        get_size = None
+        if shard_by == 'size':
+            get_size = get_source_file_size
+        downloads = pull.select_download_shard(all_downloads, shard, get_size=get_size)
+        click.echo(sharding.getDescription(shard, pull.count_download_jobs(downloads), pull.count_download_jobs(all_downloads)))
+
+    for file_data in downloads:
+        click.echo('\nDownload :  %s\nLanguage :  %s' % (file_data['path'], file_data['language']))
+        click.echo('=' * 60)
+
+        try:
+            file_written = pull.download_job(file_data, lambda: api.downloadFile(ctx, file_data))
+            click.echo('Result: "Success"')
+            click.echo('Wrote file: %s' % file_written)
+
+        except config_file.ApplangaConfigFileNotValidException as e:
+            click.echo('Result: "Error"')
+            click.secho('%s\n' % str(e), err=True, fg='red')
+            output.abort_if_fail_on_error(ctx, fail_on_error)
+
+        except api.ApplangaConnectionException as e:
+            click.secho(str(e), err=True, fg='red')
+            output.abort_if_fail_on_error(ctx, fail_on_error)
+            return
+
+        except api.ApplangaRequestException as e:
+            click.echo('Result: "Error"')
+            click.secho('There was a problem with downloading file:\n%s\n' % str(e), err=True, fg='red')
+            output.abort_if_fail_on_error(ctx, fail_on_error)
+            return
+
+
+
+def iter_source_downloads(source_files, all_app_languages, projectVersion):
+    """
+    Resolves the source blocks into single downloads, one per block and language.
+
+    Like pull.iter_download_jobs blocks which can not be downloaded are yielded
+    with 'error' set, so the problem gets reported in order with the downloads.
+    """
     request_languages = []
 
     for target in source_files:
@@ -104,12 +162,12 @@ def pullSource(ctx, tags, fail_on_error):
             # Language placeholder is defined in path so download all languages
             request_languages = list(all_app_languages)
         else:
-            # No language defined so error
-            click.echo('\nDownload :  %s\nLanguage :  %s' % (target['path'], 'missing'))
-            click.echo('=' * 60)
-            click.echo('Result: "Error"')
-            click.secho('You either need to use the <language> wildcard inside the path string or set it explicitly per file via the "language" property. \nFor more informations and examples on how todo that please refer to the Applanga CLI Integration Documentation.\n', err=True, fg='red')
-            output.abort_if_fail_on_error(ctx, fail_on_error)
+            # No language defined so error, it gets reported in order with the downloads
+            yield {
+                'path': target['path'],
+                'language': 'missing',
+                'error': 'You either need to use the <language> wildcard inside the path string or set it explicitly per file via the "language" property. \nFor more informations and examples on how todo that please refer to the Applanga CLI Integration Documentation.'
+            }
             continue
 
 
@@ -120,27 +178,34 @@ def pullSource(ctx, tags, fail_on_error):
 
         request_languages = [x for x in request_languages if x not in exclude_languages]
 
-        target['projectVersion'] = projectVersion
+        # The target span ends once the downloads of all its languages are done, see pull.trace_download
+        target_span = tracing.startSpan('target', {
+            'applanga.file.path': target['path'],
+            'applanga.tag': target.get('tag'),
+            'applanga.languages': request_languages
+        })
 
         # Go through all the languages that should be downloaded
         for language in request_languages:
-            target['language'] = language
+            # The config data is shared so only modify a copy of the block
+            file_data = dict(target)
+            file_data['language'] = language
+            file_data['projectVersion'] = projectVersion
+            if tracing.isEnabled():
+                file_data['trace_span'] = target_span.hold()
+            yield file_data
 
-            click.echo('\nDownload :  %s\nLanguage :  %s' % (target['path'], language))
-            click.echo('=' * 60)
+        target_span.release()
 
-            try:
-                file_written = api.downloadFile(ctx, target)
-                click.echo('Result: "Success"')
-                click.echo('Wrote file: %s' % file_written)
 
-            except api.ApplangaConnectionException as e:
-                click.secho(str(e), err=True, fg='red')
-                output.abort_if_fail_on_error(ctx, fail_on_error)
-                return
 
-            except api.ApplangaRequestException as e:
-                click.echo('Result: "Error"')
-                click.secho('There was a problem with downloading file:\n%s\n' % str(e), err=True, fg='red')
-                output.abort_if_fail_on_error(ctx, fail_on_error)
-                return
+def get_source_file_size(file_data):
+    """
+    Returns the size of the source file a download replaces or None.
+
+    The source files are part of the checkout, so every shard sees the same sizes.
+    """
+    try:
+        return api.getFileSize(api.getTargetFilePath(file_data))
+    except KeyError:
+        return None
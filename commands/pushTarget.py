@@ -1,9 +1,12 @@
 import click
-import requests
 from lib import api
 from lib import config_file
 from lib import output
 from lib import options
+from lib import workers
+from lib import connection
+from lib import lock_file
+from lib import sharding
 
 @click.command()
 @click.pass_context
@@ -20,7 +23,35 @@ from lib import options
     multiple=True,
     help='Only push files with the specified tags. Can be specified multiple times, e.g. --tag login --tag error'
 )
-def pushTarget(ctx, force, draft, fail_on_error, tags):
+@click.option(
+    '--jobs',
+    type=click.IntRange(min=1),
+    default=None,
+    help='Number of files to upload in parallel. Can also be set via "jobs" in the push block of the config file (default 1).'
+)
+@click.option(
+    '--incremental',
+    is_flag=True,
+    help='Only upload files whose content or upload options changed since their last successful upload.'
+)
+@click.option(
+    '--full',
+    is_flag=True,
+    help='Upload all files and record them for following --incremental runs.'
+)
+@click.option(
+    '--shard',
+    type=sharding.SHARD,
+    default=None,
+    help='Only upload the files of one of N shards, e.g. 2/4. Every file is uploaded by exactly one of the shards 1/4 to 4/4.'
+)
+@click.option(
+    '--shard-by',
+    type=click.Choice(sharding.SHARD_BY),
+    default='count',
+    help='Balance the shards by the number of files (default) or by their size.'
+)
+def pushTarget(ctx, force, draft, fail_on_error, tags, jobs, incremental, full, shard, shard_by):
     output.showCommandHeader('push', ctx)
 
     is_valid, parsed_tags = options.parse_and_validate_tags(tags)
@@ -58,8 +89,16 @@ def pushTarget(ctx, force, draft, fail_on_error, tags):
             output.abort_if_fail_on_error(ctx, fail_on_error)
             return
 
+    jobs = workers.getJobCount(jobs, config_file_data['app'].get('push'))
+    connection.setJobCount(ctx, jobs)
+
+    # Uploads are recorded in the lock file for --incremental. --force and --full upload everything.
+    lock = None
+    if incremental or full:
+        lock = lock_file.read()
+
     try:
-        (file_responses, skippedFiles) = api.uploadFiles(ctx, target_files, force=force, draft=draft)
+        (file_responses, skippedFiles) = api.uploadFiles(ctx, target_files, force=force, draft=draft, jobs=jobs, lock=lock, incremental=incremental and not (force or full), shard=shard, shard_by=shard_by)
     except api.ApplangaConnectionException as e:
         click.secho(str(e), err=True, fg='red')
         click.secho('There was a problem with pushing files:\n%s\n' % str(e), err=True, fg='red')
@@ -69,16 +108,26 @@ def pushTarget(ctx, force, draft, fail_on_error, tags):
         click.secho('There was a problem with pushing files:\n%s\n' % str(e), err=True, fg='red')
         output.abort_if_fail_on_error(ctx, fail_on_error)
         return
+    finally:
+        if lock is not None:
+            lock.save()
 
     if len(file_responses) == 0:
         click.secho('No file to upload got found.', err=True, fg='red')
         output.abort_if_fail_on_error(ctx, fail_on_error)
 
+    # Uploads get cancelled when the deadline of sync --deadline passes
+    cancelled = 0
     for upload_data in file_responses:
         language = upload_data['language'] if 'language' in upload_data else 'language missing'
         click.echo('\nUpload   :  %s\nLanguage :  %s' % (upload_data['path'], language))
         click.echo('=' * 60)
 
+        if 'cancelled' in upload_data:
+            cancelled += 1
+            click.echo('Result: "Cancelled"')
+            continue
+
         if 'error' in upload_data:
             # There was a problem with the import
             click.echo('Result: "Error"')
@@ -86,6 +135,14 @@ def pushTarget(ctx, force, draft, fail_on_error, tags):
             output.abort_if_fail_on_error(ctx, fail_on_error)
             continue
 
+        if 'unchanged' in upload_data:
+            click.echo('Result: "Success"\n\n - File unchanged since last upload, skipped\n')
+            continue
+
         # Import was successful
         response_json = upload_data['response'].json()
         click.echo('Result: "Success"\n\n - Entries in file: %d\n - Added:           %d\n - Updated:         %d\n - Tag updates:     %d\n - Files skipped:   %d\n' % (response_json['total'], response_json['added'], response_json['updated'], response_json['tagUpdates'], len(skippedFiles)))
+
+    if cancelled:
+        output.show_deadline_summary(ctx, len(file_responses) - cancelled, cancelled)
+        output.abort_if_fail_on_error(ctx, fail_on_error)
@@ -0,0 +1,96 @@
+import click
+from lib import output
+from lib import deadline
+from lib import tracing
+from commands import push
+from commands import pushTarget
+from commands import pull
+from commands import pullSource
+
+
+@click.command()
+@click.pass_context
+@click.option('--force', type=click.BOOL, is_flag=True, help="Overwrite existing values")
+@click.option('--draft', type=click.BOOL, is_flag=True, help="Upload values as draft")
+@click.option(
+    '--fail-on-error',
+    is_flag=True,
+    help='Fail immediately on any validation, upload or download error (exit code 1).'
+)
+@click.option(
+    '--tag',
+    'tags',
+    multiple=True,
+    help='Only sync files with the specified tags. Can be specified multiple times, e.g. --tag login --tag error'
+)
+@click.option(
+    '--languages',
+    'languages',
+    default='',
+    help='Comma separated list of language codes to limit pulled entries (e.g. "en,de-DE").'
+)
+@click.option(
+    '--jobs',
+    type=click.IntRange(min=1),
+    default=None,
+    help='Number of files to upload and download in parallel. Can also be set via "jobs" in the push and pull block of the config file (default 1).'
+)
+@click.option(
+    '--incremental',
+    is_flag=True,
+    help='Only upload files whose content or upload options changed since their last successful upload.'
+)
+@click.option(
+    '--push-target',
+    is_flag=True,
+    help='Also push the target files after the source files, like "pushtarget".'
+)
+@click.option(
+    '--pull-source',
+    is_flag=True,
+    help='Also pull the source files after the target files, like "pullsource".'
+)
+@click.option(
+    '--deadline',
+    'deadline_seconds',
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help='Maximum number of seconds the whole sync may take. Files which did not finish in time are cancelled.'
+)
+def sync(ctx, force, draft, fail_on_error, tags, languages, jobs, incremental, push_target, pull_source, deadline_seconds):
+    """Pushes the source files and then pulls the target files in one run.
+
+    All steps share the connection pool and the parsed config file. The
+    project version and the project languages are requested once for the
+    pull steps. The steps run one after the other as the pull has to see
+    what got pushed and the output of the steps must not mix.
+    """
+    output.showCommandHeader('sync', ctx)
+
+    # One deadline for all steps, the single commands keep it running
+    deadline.start(ctx, deadline_seconds)
+
+    showStep('push')
+    with tracing.span('push'):
+        ctx.invoke(push.push, force=force, draft=draft, fail_on_error=fail_on_error, tags=tags, jobs=jobs, incremental=incremental, full=False, deadline_seconds=None, plan=False, shard=None, shard_by='count')
+
+    if push_target:
+        showStep('pushtarget')
+        with tracing.span('pushtarget'):
+            ctx.invoke(pushTarget.pushTarget, force=force, draft=draft, fail_on_error=fail_on_error, tags=tags, jobs=jobs, incremental=incremental, full=False, shard=None, shard_by='count')
+
+    # The pushes changed the project so the pull steps need the version after them
+    ctx.obj.pop('project-version', None)
+
+    showStep('pull')
+    with tracing.span('pull'):
+        ctx.invoke(pull.pull, tags=tags, languages=languages, fail_on_error=fail_on_error, jobs=jobs, full=False, fsync=False, deadline_seconds=None, bulk=False, plan=False, shard=None, shard_by='count', shard_sizes=None)
+
+    if pull_source:
+        showStep('pullsource')
+        with tracing.span('pullsource'):
+            ctx.invoke(pullSource.pullSource, tags=tags, fail_on_error=fail_on_error, shard=None, shard_by='count')
+
+
+def showStep(step_name):
+    click.echo('\n%s\nSync step: %s\n%s' % ('#' * 60, step_name, '#' * 60))
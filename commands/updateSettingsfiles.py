@@ -1,9 +1,7 @@
 import click
-import requests
 from lib import api, constants
 from lib import output
 import os
-import tarfile
 import json
 from lib import api
 from lib import connection
@@ -14,6 +12,8 @@ from lib import connection
 def updateSettingsfiles(ctx):
     output.showCommandHeader('updateSettingsfiles', ctx)
 
+    import tarfile
+
     projectPath = os.getcwd()
 
     click.echo('-> searching for applanga settingfiles in ' + projectPath)
@@ -65,9 +65,13 @@ def downloadSettingsFile(ctx, url, path):
     Returns:
         None
     """
+    import requests
+
     try:
-        response = connection.requestWrap(ctx, 'get', url)
-        open(path, 'wb').write(response.content)
+        response = connection.requestWrap(ctx, 'get', url, stream=True, timeout=api.getTimeout(ctx))
+        api.writeFile(path, response.iter_content(chunk_size=api.DOWNLOAD_CHUNK_SIZE))
+    except requests.exceptions.Timeout as e:
+        raise api.ApplangaRequestException('Request timed out. The server did not respond in time.')
     except requests.exceptions.ConnectionError as e:
         raise api.ApplangaRequestException('Problem connecting to server. Please check your internet connection.')
     except:
@@ -1,27 +1,55 @@
 import click
-import requests
 import json
 import os
 import errno
 import re
 import time
+import hashlib
+import shutil
+import stat
+import tempfile
+import threading
+import zipfile
 
 from lib import constants
 from lib import config_file
 from lib import files
 from lib import connection
+from lib import workers
+from lib import lock_file
+from lib import multipart
+from lib import retry
+from lib import deadline
+from lib import rate_limit
+from lib import json_scan
+from lib import cache
+from lib import languages
+from lib import profiling
+from lib import metrics
+from lib import tracing
+from lib import sharding
 
 try:
     FileNotFoundError
 except NameError:
     FileNotFoundError = IOError
 
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Permissions of new files as allowed by the umask, see getNewFileMode
+_new_file_mode = None
+_new_file_mode_lock = threading.Lock()
+
 class ApplangaRequestException(Exception):
-    pass
+    # Status code of the API response which caused the exception if any
+    status_code = None
 
 class ApplangaConnectionException(Exception):
     pass
 
+class ApplangaDeadlineException(ApplangaConnectionException):
+    pass
+
 class ApplangaAuthenticationException(Exception):
     pass
 
@@ -37,6 +65,294 @@ def downloadFile(ctx, file_data):
 
     """
 
+    return downloadFileIfChanged(ctx, file_data)[0]
+
+
+
+def downloadFileIfChanged(ctx, file_data, lock=None, force=False, fsync=False):
+    """Downloads file from Applanga unless it did not change since the last download.
+
+    If a lock file is given nothing gets requested as long as the project
+    version, the request and the local file did not change since the last
+    download. Otherwise the ETag of the last download is sent along and the
+    file is only written if its content differs from the local one.
+
+    Args:
+        ctx: click context
+        file_data: Data about the files to download.
+        lock: LockFile with the state of previous downloads. If None the file
+            always gets downloaded and written.
+        force: if true download and write the file no matter what the lock
+            file says but still record it there
+        fsync: if true make sure the file is on disk before it replaces the old one
+
+    Returns:
+        Tuple of the path of the file and if it got written.
+
+    """
+
+    import requests
+
+    # Files still waiting for a worker when the deadline passed are cancelled right away
+    checkDeadline(ctx)
+
+    request_data, file_path, request_key, lock_entry = getDownloadState(file_data, lock, force)
+
+    headers = None
+    if lock_entry:
+        if lock_entry.get('projectVersion') == request_data['version']:
+            return file_path, False
+        if lock_entry.get('etag'):
+            headers = {'If-None-Match': lock_entry['etag']}
+
+    try:
+        response = makeRequest(ctx, data=request_data, api_path='/files', headers=headers, stream=True, target_path=file_path)
+    except ApplangaRequestException as e:
+        raise ApplangaRequestException(str(e))
+
+    try:
+        if response.status_code == 304:
+            lock_entry = dict(lock_entry)
+            lock_entry['projectVersion'] = request_data['version']
+            lock.set('pull', file_path, lock_entry)
+            return file_path, False
+
+        chunks = profiling.timeIterator('transfer', response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+        if deadline.get(ctx) is not None:
+            chunks = iterBeforeDeadline(ctx, chunks)
+
+        # Without a lock file the file is always written like before
+        content_hash, written = writeFile(file_path, chunks, fsync=fsync, keep_unchanged=lock is not None and not force)
+    except requests.exceptions.RequestException as e:
+        checkDeadline(ctx)
+        raise ApplangaConnectionException('Problem connecting to server. Please check your internet connection.')
+    finally:
+        closeResponse(ctx, response)
+
+    recordDownload(lock, file_path, request_data, request_key, content_hash, response.headers.get('ETag'))
+
+    return file_path, written
+
+
+
+def getDownloadState(file_data, lock=None, force=False):
+    """Collects what is needed to download a file and what is known about its last download.
+
+    Args:
+        file_data: Data about the files to download.
+        lock: LockFile with the state of previous downloads or None.
+        force: if true the state of previous downloads is ignored
+
+    Returns:
+        Tuple of the request data, the path of the file, the key of the
+        request in the lock file and the lock entry of the last download.
+        The lock entry is None if it does not match the request or the local
+        file changed since.
+
+    """
+
+    request_data = getDownloadRequestData(file_data)
+    file_path = getTargetFilePath(file_data)
+
+    lock_entry = None
+    request_key = None
+    if lock is not None:
+        request_key = getLockRequestKey(request_data, ignore=['version'])
+        lock_entry = None if force else lock.get('pull', file_path)
+
+        # The recorded state is only of use if the same was requested and the local file is untouched
+        if lock_entry and (lock_entry.get('request') != request_key or not lock_file.fileMatches(lock_entry, file_path)):
+            lock_entry = None
+
+    return request_data, file_path, request_key, lock_entry
+
+
+
+def recordDownload(lock, file_path, request_data, request_key, content_hash, etag=None):
+    """Records a finished download in the lock file if one is used."""
+
+    if lock is None:
+        return
+
+    lock_entry = {
+        'projectVersion': request_data['version'],
+        'request': request_key,
+        'sha256': content_hash
+    }
+    if etag:
+        lock_entry['etag'] = etag
+    lock_entry.update(lock_file.fileStat(file_path))
+    lock.set('pull', file_path, lock_entry)
+
+
+
+def downloadFiles(ctx, files_data, lock=None, force=False, fsync=False):
+    """Downloads several languages of the same target, if possible with a single request.
+
+    All languages which did not change since the last download get requested
+    as one archive from the bulk endpoint and unpacked into their files. If
+    the server does not support bulk downloads or a language is missing in
+    the archive the files get downloaded one by one with downloadFileIfChanged.
+
+    Args:
+        ctx: click context
+        files_data: Data about the files to download. They only differ in the language.
+        lock: LockFile with the state of previous downloads or None.
+        force: if true download and write the files no matter what the lock file says
+        fsync: if true make sure the files are on disk before they replace the old ones
+
+    Returns:
+        List of tuples of (file_data, result, exception) in the order of
+        files_data. The result is the one of downloadFileIfChanged.
+
+    """
+
+    # Files still waiting for a worker when the deadline passed are cancelled right away
+    checkDeadline(ctx)
+
+    results = [None] * len(files_data)
+    bulk_files = {}
+    for index, file_data in enumerate(files_data):
+        try:
+            request_data, file_path, request_key, lock_entry = getDownloadState(file_data, lock, force)
+        except ApplangaRequestException as e:
+            results[index] = (file_data, None, e)
+            continue
+
+        if lock_entry and lock_entry.get('projectVersion') == request_data['version']:
+            results[index] = (file_data, (file_path, False), None)
+            continue
+
+        bulk_files[file_data['language']] = (index, request_data, file_path, request_key)
+
+    if len(bulk_files) > 1 and isBulkDownloadSupported(ctx):
+        try:
+            unpacked = downloadArchive(ctx, bulk_files, lock, force, fsync)
+        except ApplangaConnectionException as e:
+            # Trying each file on its own would only run into the same problem
+            unpacked = dict((language, (None, e)) for language in bulk_files)
+
+        for language, (result, error) in unpacked.items():
+            index = bulk_files[language][0]
+            results[index] = (files_data[index], result, error)
+
+    for index, file_data in enumerate(files_data):
+        if results[index] is not None:
+            continue
+        try:
+            results[index] = (file_data, downloadFileIfChanged(ctx, file_data, lock, force=force, fsync=fsync), None)
+        except (ApplangaRequestException, ApplangaConnectionException) as e:
+            results[index] = (file_data, None, e)
+
+    return results
+
+
+
+def isBulkDownloadSupported(ctx):
+    """Returns if bulk downloads are worth trying. It is false once one failed."""
+    return ctx.obj.get('bulk-download') is not False
+
+
+
+def downloadArchive(ctx, bulk_files, lock=None, force=False, fsync=False):
+    """Downloads multiple languages of a target as archive and writes them to their files.
+
+    The archive is a zip file with one entry per language. The name of an
+    entry is the language code, optionally followed by a file extension. The
+    entry names are never used as paths, the files get written to the same
+    paths as by downloadFileIfChanged.
+
+    Args:
+        ctx: click context
+        bulk_files: Dict of language to tuples of index, request data, file
+            path and lock request key as returned by getDownloadState.
+        lock: LockFile to record the downloads in or None.
+        force: if true files with unchanged content get written as well
+        fsync: if true make sure the files are on disk before they replace the old ones
+
+    Returns:
+        Dict of language to tuples of (result, exception) for all languages
+        found in the archive. It is empty if the archive could not be used.
+
+    """
+
+    import requests
+
+    request_data = dict(next(iter(bulk_files.values()))[1])
+    del request_data['language']
+    request_data['languages'] = ','.join(bulk_files)
+
+    try:
+        response = makeRequest(ctx, data=request_data, api_path='/files/bulk', stream=True)
+    except ApplangaDeadlineException:
+        raise
+    except ApplangaRequestException:
+        # Whatever made the server decline it, e.g. no support or too many languages,
+        # the following targets would fail the same way so they are downloaded file by file
+        ctx.obj['bulk-download'] = False
+        return {}
+    except ApplangaConnectionException:
+        ctx.obj['bulk-download'] = False
+        raise
+
+    unpacked = {}
+    try:
+        if 'zip' not in response.headers.get('Content-Type', ''):
+            ctx.obj['bulk-download'] = False
+            return unpacked
+
+        chunks = profiling.timeIterator('transfer', response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+        if deadline.get(ctx) is not None:
+            chunks = iterBeforeDeadline(ctx, chunks)
+
+        # Zip files can only be read from a seekable file so the archive gets stored temporarily
+        with tempfile.TemporaryFile() as archive_file:
+            with profiling.phase('write'), tracing.span('write archive'):
+                for chunk in chunks:
+                    archive_file.write(chunk)
+
+            with zipfile.ZipFile(archive_file) as archive:
+                for entry in archive.infolist():
+                    language = os.path.splitext(os.path.basename(entry.filename))[0]
+                    if entry.is_dir() or language not in bulk_files or language in unpacked:
+                        continue
+
+                    index, language_request_data, file_path, request_key = bulk_files[language]
+                    try:
+                        with archive.open(entry) as entry_file:
+                            content_hash, written = writeFile(file_path, iter(lambda: entry_file.read(DOWNLOAD_CHUNK_SIZE), b''), fsync=fsync, keep_unchanged=lock is not None and not force)
+                    except ApplangaRequestException as e:
+                        unpacked[language] = (None, e)
+                        continue
+
+                    recordDownload(lock, file_path, language_request_data, request_key, content_hash)
+                    unpacked[language] = ((file_path, written), None)
+    except requests.exceptions.RequestException as e:
+        checkDeadline(ctx)
+        raise ApplangaConnectionException('Problem connecting to server. Please check your internet connection.')
+    except zipfile.BadZipFile:
+        # Whatever did not get unpacked yet is downloaded file by file
+        ctx.obj['bulk-download'] = False
+    finally:
+        if response.applanga_metrics is not None:
+            response.applanga_metrics['files'] = len([language for language in unpacked if unpacked[language][1] is None])
+        closeResponse(ctx, response)
+
+    return unpacked
+
+
+
+def getDownloadRequestData(file_data):
+    """Validates the data of a file to download and converts it to request data for the API.
+
+    Args:
+        file_data: Data about the files to download.
+
+    Returns:
+        The request data for the /files endpoint
+
+    """
+
     # Make sure it contains all the data that is needed
     if 'language' not in file_data:
         raise ApplangaRequestException('Request is incomplete. The language is missing.')
@@ -108,70 +424,172 @@ def downloadFile(ctx, file_data):
             request_options['excludeBaseLang'] = file_data['excludeBaseLang']
 
 
-    try:
-        # Request the file from server
-        request_data = {
-            'file-format': file_data['file_format'],
-            'language': file_data['language'],
-            'options': json.dumps(request_options)
-        }
+    request_data = {
+        'file-format': file_data['file_format'],
+        'language': file_data['language'],
+        'options': json.dumps(request_options)
+    }
 
-        if 'tag' in file_data:
-            request_data['tag'] = file_data['tag']
-        
-        if 'key_prefix' in file_data:
-            request_data['removeKeyPrefix'] = file_data['key_prefix']
+    if 'tag' in file_data:
+        request_data['tag'] = file_data['tag']
+    
+    if 'key_prefix' in file_data:
+        request_data['removeKeyPrefix'] = file_data['key_prefix']
 
-        request_data['version'] = file_data['projectVersion']
+    request_data['version'] = file_data['projectVersion']
 
-        response = makeRequest(ctx, data=request_data, api_path='/files')
+    return request_data
 
-    except ApplangaRequestException as e:
-        raise ApplangaRequestException(str(e))
 
-    language = file_data['language']
+
+def getLockRequestKey(request_data, ignore=()):
+    """Returns a hash identifying a request in the lock file.
+
+    Args:
+        request_data: Data describing the request.
+        ignore: Keys of request_data which do not change the result (e.g. the project version).
+
+    Returns:
+        Hex digest of the request data and the branch of the config file
+
+    """
+    lock_request = dict((key, value) for key, value in request_data.items() if key not in ignore)
 
     try:
-        config_file_data = config_file.readRaw()
-        languageMapping = config_file_data['languageMap']
-        if languageMapping[language]:
-            language = languageMapping[language]
-    except Exception as e:
+        app_data = config_file.readRaw()['app']
+        lock_request['branch'] = app_data.get('branch_id')
+    except config_file.ApplangaConfigFileNotValidException:
         pass
 
-    # android_xml and arb files have special files naming conventions
-    # nb-NO.android_xml to nb-rNO.android.xml
-    # nb-NO.arb to nb_NO.arb
-    language_ = language.replace('-', '_')
-    if 'android_xml' == file_data['file_format'] and len(language) == 5:
-        language = language.replace('-', '-r')
+    return lock_file.hashData(lock_request)
+
+
+
+def getTargetFilePath(file_data):
+    """Returns the local path a downloaded file gets written to.
+
+    Args:
+        file_data: Data about the files to download.
+
+    Returns:
+        The file path with the <language> placeholder replaced
+
+    """
 
-    if 'arb' == file_data['file_format'] and len(language) >= 5:
-        language = language_
+    # Applies the languageMap and the naming conventions of android_xml and arb files
+    language, language_ = languages.getTable().toLocal(file_data['language'], file_data['file_format'])
 
     #if we detect a language folder with an _ locale but non with - we store the files int the _ folder
     file_path = file_data['path'].replace('<language>', language)
     file_path_ = file_data['path'].replace('<language>', language_)
     if not os.path.exists(os.path.dirname(file_path)) and os.path.exists(os.path.dirname(file_path_)):
         file_path = file_path_
-        
+
+    return file_path
+
+
+
+@profiling.timed('write')
+@tracing.traced('write')
+def writeFile(file_path, chunks, fsync=False, keep_unchanged=False):
+    """Writes downloaded content to the given path and creates missing directories.
+
+    The content is streamed into a temporary file next to the target which then
+    atomically replaces it. So memory does not grow with the file size and an
+    interrupted download never leaves a truncated file behind.
+
+    Args:
+        file_path: Path to write to.
+        chunks: Iterable of the file content in bytes.
+        fsync: if true flush the content to disk before replacing the file
+        keep_unchanged: if true the existing file is not touched when its
+            content is the same
+
+    Returns:
+        Tuple of the sha256 hex digest of the content and if the file got written.
+
+    """
+
+    write_span = tracing.getCurrentSpan()
+    write_span.setAttribute('applanga.file.path', file_path)
+
+    directory = os.path.dirname(file_path)
+    temp_path = None
+
     try:
         # Makes sure that the directory we want to write into exists
-        if not os.path.exists(os.path.dirname(file_path)):
+        if directory and not os.path.exists(directory):
             try:
-                os.makedirs(os.path.dirname(file_path))
+                os.makedirs(directory)
             except OSError as e:
                 if e.errno != errno.EEXIST:
                     raise
 
-        open(file_path, 'wb').write(response.content)
-        return file_path
+        handle, temp_path = tempfile.mkstemp(prefix='.%s.' % os.path.basename(file_path), suffix='.tmp', dir=directory or '.')
+        sha = hashlib.sha256()
+        with os.fdopen(handle, 'wb') as temp_file:
+            for chunk in chunks:
+                if chunk:
+                    sha.update(chunk)
+                    temp_file.write(chunk)
+            if fsync:
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+        content_hash = sha.hexdigest()
+
+        if keep_unchanged and lock_file.hashFile(file_path) == content_hash:
+            write_span.setAttribute('applanga.file.written', False)
+            return content_hash, False
+
+        # mkstemp only grants access to the owner so apply the permissions a new file would get
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+        else:
+            os.chmod(temp_path, getNewFileMode(directory or '.'))
+
+        os.replace(temp_path, file_path)
+        temp_path = None
+        write_span.setAttribute('applanga.file.written', True)
+        return content_hash, True
     except FileNotFoundError as e:
         raise ApplangaRequestException('Could not write file "%s": %s' % (file_path, str(e)))
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+
+def getNewFileMode(directory):
+    """Returns the permissions a new file gets with the umask of the process.
+
+    os.umask can only read the umask by changing it for the whole process,
+    which would affect files created by other threads meanwhile. So the
+    permissions are taken from a file created once in the given directory.
+
+    Args:
+        directory: Writable directory to create the file in.
+
+    Returns:
+        The permission bits for chmod.
 
+    """
+    global _new_file_mode
+
+    with _new_file_mode_lock:
+        if _new_file_mode is None:
+            probe_path = os.path.join(directory, '.applanga-mode-%d-%d.tmp' % (os.getpid(), threading.get_ident()))
+            handle = os.open(probe_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            try:
+                _new_file_mode = stat.S_IMODE(os.fstat(handle).st_mode)
+            finally:
+                os.close(handle)
+                os.remove(probe_path)
 
+    return _new_file_mode
 
-def uploadFiles(ctx, upload_files, force=False, draft=False):
+
+
+def uploadFiles(ctx, upload_files, force=False, draft=False, jobs=1, lock=None, incremental=False, shard=None, shard_by='count'):
     """Uploads multiple files to Applanga.
 
     Args:
@@ -179,20 +597,172 @@ def uploadFiles(ctx, upload_files, force=False, draft=False):
         upload_files: Data about the files to upload.
         force: if true overwrite entries in the project
         draft: if true push content as draft values
+        jobs: number of files to upload in parallel
+        lock: LockFile to record successful uploads in
+        incremental: if true files which did not change since their last
+            recorded upload with the same options are not uploaded again.
+            Their entry in the result has 'unchanged' set.
+        shard: Tuple of (index, count) to only upload the files of one shard, see selectUploadShard.
+        shard_by: How the files are balanced between the shards, one of sharding.SHARD_BY.
+
+    Files which could not be uploaded before the deadline of the command
+    passed have 'cancelled' set next to the 'error'.
 
     Returns:
         API response
 
     """
 
+    blocks, return_data, skippedFiles = findUploadFiles(upload_files)
+
+    files_to_upload = []
+    for source, language_files in blocks:
+        # The span of the block ends once all its files are uploaded, see upload
+        source_span = tracing.startSpan('target', {
+            'applanga.file.path': source['path'],
+            'applanga.tag': source.get('tag'),
+            'applanga.files': len(language_files['found'])
+        })
+        files_to_upload.append((language_files['found'], source_span))
+
+    # Upload all the files, or with a shard the ones of this shard
+    upload_jobs = [(file_path, files_data[file_path], source_span) for files_data, source_span in files_to_upload for file_path in files_data]
+    if shard is not None:
+        total = len(upload_jobs)
+        upload_jobs = selectUploadShard(upload_jobs, shard, shard_by)
+        click.echo(sharding.getDescription(shard, len(upload_jobs), total))
+
+    for upload_job in upload_jobs:
+        upload_job[2].hold()
+    for files_data, source_span in files_to_upload:
+        source_span.release()
+
+    def upload(upload_job):
+        file_path, file_data, source_span = upload_job
+
+        try:
+            with tracing.span('language', {'applanga.language': file_data['language'], 'applanga.file.path': file_path}, parent=source_span) as language_span:
+                upload_result = uploadLanguageFile(file_path, file_data)
+                if 'error' in upload_result:
+                    language_span.setError(upload_result['error'])
+                language_span.setAttribute('applanga.file.unchanged', upload_result.get('unchanged', False))
+                return upload_result
+        finally:
+            source_span.release()
+
+    def uploadLanguageFile(file_path, file_data):
+        try:
+            # Files still waiting for a worker when the deadline passed are cancelled right away
+            checkDeadline(ctx)
+        except ApplangaDeadlineException as e:
+            return {
+                'language': file_data['language'],
+                'path': file_path,
+                'error': str(e),
+                'cancelled': True
+            }
+
+        # Make sure it contains all the data that is needed
+        if 'file_format' not in file_data:
+            return {
+                'language': file_data['language'],
+                'path': file_path,
+                'error': 'Request is incomplete. The file_format is missing.'
+            }
+
+        send_data = getUploadData(file_path, file_data)
+
+        if lock is not None:
+            # The same file can be pushed by multiple blocks so uploads are keyed by path, language, tag and options
+            request_key = getUploadLockKey(send_data, force, draft)
+            lock_entry = lock.get('push', request_key)
+            if incremental and lock_file.fileMatches(lock_entry, file_path):
+                return {
+                    'language': file_data['language'],
+                    'path': file_path,
+                    'unchanged': True
+                }
+
+            # Get the state before the upload in case the file changes while uploading
+            try:
+                file_state = lock_file.fileStat(file_path)
+            except OSError:
+                file_state = None
+            if file_state:
+                file_state['sha256'] = lock_file.hashFile(file_path)
+
+        try:
+            response = uploadFile(ctx, send_data, force=force, draft=draft)
+
+            if lock is not None and file_state:
+                file_state['path'] = file_path
+                file_state['language'] = send_data['language']
+                if 'tag' in send_data:
+                    file_state['tag'] = send_data['tag']
+                lock.set('push', request_key, file_state)
+
+            return {
+                'language': file_data['language'],
+                'path': file_path,
+                'response': response
+            }
+        except ApplangaDeadlineException as e:
+            return {
+                'language': file_data['language'],
+                'path': file_path,
+                'error': str(e),
+                'cancelled': True
+            }
+        except ApplangaRequestException as e:
+            return {
+                'language': file_data['language'],
+                'path': file_path,
+                'error': str(e)
+            }
+
+    # Results come back in the order of upload_jobs no matter which upload finishes first
+    for upload_job, upload_result, error in workers.runOrdered(upload, upload_jobs, jobs):
+        if error is not None:
+            raise error
+
+        return_data.append(upload_result)
+        if 'file_format' not in upload_job[1]:
+            skippedFiles.append(upload_job[0])
+        elif 'response' in upload_result and 'skipped' in language_files:
+            skippedFiles = skippedFiles + language_files['skipped']
+
+    return return_data, skippedFiles
+
+
+
+def findUploadFiles(upload_files):
+    """Checks the source blocks and looks up the files they match.
+
+    The work plan of push uses it as well so it lists the same files which
+    uploadFiles uploads.
+
+    Args:
+        upload_files: Data about the files to upload.
+
+    Returns:
+        Tuple of the blocks, the errors and the skipped files. The blocks are
+        a list of tuples of the source block and its result of files.getFiles.
+        Every error is a dict with 'path' and 'error' like in the result of
+        uploadFiles.
+
+    """
+
     placeholder_files = {}
 
     return_data = []
 
-    files_to_upload = [];
+    blocks = []
 
     skippedFiles = [];
 
+    # All blocks look up their files in the same index so every folder is only read once
+    discovery_index = files.createDiscoveryIndex(getDiscoveryIgnore())
+
     for source in upload_files:
         # Check if we have the data we need for sure
         if 'path' not in source:
@@ -297,109 +867,131 @@ def uploadFiles(ctx, upload_files, force=False, draft=False):
                 skippedFiles.append(source['path'])
                 continue
 
-        language_files = files.getFiles(source)
+        language_files = files.getFiles(source, discovery_index)
 
-        files_to_upload.append(language_files['found'])
+        blocks.append((source, language_files))
 
         if language_files['uses_placeholder'] == True:
             placeholder_files.update()
 
-    # Upload all the files
-    for files_data in files_to_upload:
+    return blocks, return_data, skippedFiles
 
-        for file_path in files_data:
-            file_data = files_data[file_path]
 
-            # Make sure it contains all the data that is needed
-            if 'file_format' not in file_data:
-                return_data.append(
-                    {
-                        'language': file_data['language'],
-                        'path': file_path,
-                        'error': 'Request is incomplete. The file_format is missing.'
-                    }
-                )
-                skippedFiles.append(source['path'])
 
-            try:
-                send_data = {
-                    'file_format':  file_data['file_format'],
-                    'language': file_data['language'],
-                    'path': file_path
-                }
+def selectUploadShard(upload_jobs, shard, shard_by='count'):
+    """Returns the uploads one shard of a push handles, see sharding.selectItems.
 
-                if 'tag' in file_data:
-                    send_data['tag'] = file_data['tag']
+    Args:
+        upload_jobs: List of tuples which start with the path and the data of a file found by files.getFiles.
+        shard: Tuple of (index, count).
+        shard_by: count to balance the number of files, size to balance their size on disk.
 
-                if 'keepTagIds' in file_data:
-                    send_data['keepTagIds'] = file_data['keepTagIds']
-                    
-                if 'tag_category' in file_data:
-                    send_data['tag_category'] = file_data['tag_category']
+    Returns:
+        The upload_jobs of the shard in their order.
 
-                if 'key_prefix' in file_data:
-                    send_data['key_prefix'] = file_data['key_prefix']
+    """
+    getSize = None
+    if shard_by == 'size':
+        getSize = lambda upload_job: getFileSize(upload_job[0])
+    return sharding.selectItems(upload_jobs, shard, lambda upload_job: '%s\n%s\n%s' % (upload_job[0], upload_job[1]['language'], upload_job[1].get('tag')), getSize)
 
-                if  'disable_plurals' in file_data:
-                    send_data['disable_plurals'] = file_data['disable_plurals']
 
-                if 'importStatus' in file_data:
-                    send_data['importStatus'] = file_data['importStatus']
 
-                if file_data['file_format'] in ['xliff'] and 'skipLockedTranslations' in file_data:
-                    send_data['skipLockedTranslations'] = file_data['skipLockedTranslations']
+def getFileSize(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return None
 
-                if file_data['file_format'] in ['xliff'] and 'skipEmptyTranslations' in file_data:
-                    send_data['skipEmptyTranslations'] = file_data['skipEmptyTranslations']
 
-                if file_data['file_format'] in ['xliff'] and 'createUnknownCustomStates' in file_data:
-                    send_data['createUnknownCustomStates'] = file_data['createUnknownCustomStates']
 
-                if 'remove_cr_char' in file_data:
-                    send_data['removeCrChar'] = file_data['remove_cr_char']
+def getUploadLockKey(send_data, force=False, draft=False):
+    """Returns the key of an upload in the lock file, see getLockRequestKey."""
+    return getLockRequestKey({'send_data': send_data, 'force': force, 'draft': draft})
 
-                if 'onlyIfTextEmpty' in file_data and file_data['file_format'] in ['xliff']:
-                    send_data['onlyIfTextEmpty'] = file_data['onlyIfTextEmpty']
 
-                if file_data['file_format'] in ['xliff'] and'onlyAsDraft' in file_data:
-                    send_data['onlyAsDraft'] = file_data['onlyAsDraft']
 
-                if file_data['file_format'] in ['xliff'] and 'importSourceLanguage' in file_data:
-                    send_data['importSourceLanguage'] = file_data['importSourceLanguage']
+def getDiscoveryIgnore():
+    """Returns the additional folder patterns to skip when looking for files with ** set in the config file."""
 
-                if 'json' in file_data['file_format'] and 'skipNonStringValues' in file_data:
-                    send_data['skipNonStringValues'] = file_data['skipNonStringValues']
+    try:
+        return config_file.readRaw()['app'].get('discovery_ignore', [])
+    except config_file.ApplangaConfigFileNotValidException:
+        return []
 
-                if file_data['file_format'] in ['csv', 'tsv', 'xls']:
-                    if 'includeFirstRow' in file_data:
-                        send_data['includeFirstRow'] = file_data['includeFirstRow']
-                    if 'autoGenerateMissingKeys' in file_data:
-                        send_data['autoGenerateMissingKeys'] = file_data['autoGenerateMissingKeys']
-                    if 'columnDescription' in file_data:
-                        send_data['columnDescription'] = file_data['columnDescription']
-                    if 'sheetName' in file_data:
-                        send_data['sheetName'] = file_data['sheetName']
 
-                response = uploadFile(ctx, send_data, force=force, draft=draft)
-                return_data.append(
-                    {
-                        'language': file_data['language'],
-                        'path': file_path,
-                        'response': response
-                    }
-                )
-                if('skipped' in language_files):
-                    skippedFiles = skippedFiles + language_files['skipped']
-            except ApplangaRequestException as e:
-                return_data.append(
-                    {
-                        'language': file_data['language'],
-                        'path': file_path,
-                        'error': str(e)
-                    }
-                )
 
-    return return_data, skippedFiles
+def getUploadData(file_path, file_data):
+    """Collects the data uploadFile needs for a single file found by files.getFiles.
+
+    Args:
+        file_path: Path of the file to upload.
+        file_data: Data about the file as returned by files.getFiles.
+
+    Returns:
+        The data to pass to uploadFile
+
+    """
+
+    send_data = {
+        'file_format':  file_data['file_format'],
+        'language': file_data['language'],
+        'path': file_path
+    }
+
+    if 'tag' in file_data:
+        send_data['tag'] = file_data['tag']
+
+    if 'keepTagIds' in file_data:
+        send_data['keepTagIds'] = file_data['keepTagIds']
+        
+    if 'tag_category' in file_data:
+        send_data['tag_category'] = file_data['tag_category']
+
+    if 'key_prefix' in file_data:
+        send_data['key_prefix'] = file_data['key_prefix']
+
+    if  'disable_plurals' in file_data:
+        send_data['disable_plurals'] = file_data['disable_plurals']
+
+    if 'importStatus' in file_data:
+        send_data['importStatus'] = file_data['importStatus']
+
+    if file_data['file_format'] in ['xliff'] and 'skipLockedTranslations' in file_data:
+        send_data['skipLockedTranslations'] = file_data['skipLockedTranslations']
+
+    if file_data['file_format'] in ['xliff'] and 'skipEmptyTranslations' in file_data:
+        send_data['skipEmptyTranslations'] = file_data['skipEmptyTranslations']
+
+    if file_data['file_format'] in ['xliff'] and 'createUnknownCustomStates' in file_data:
+        send_data['createUnknownCustomStates'] = file_data['createUnknownCustomStates']
+
+    if 'remove_cr_char' in file_data:
+        send_data['removeCrChar'] = file_data['remove_cr_char']
+
+    if 'onlyIfTextEmpty' in file_data and file_data['file_format'] in ['xliff']:
+        send_data['onlyIfTextEmpty'] = file_data['onlyIfTextEmpty']
+
+    if file_data['file_format'] in ['xliff'] and'onlyAsDraft' in file_data:
+        send_data['onlyAsDraft'] = file_data['onlyAsDraft']
+
+    if file_data['file_format'] in ['xliff'] and 'importSourceLanguage' in file_data:
+        send_data['importSourceLanguage'] = file_data['importSourceLanguage']
+
+    if 'json' in file_data['file_format'] and 'skipNonStringValues' in file_data:
+        send_data['skipNonStringValues'] = file_data['skipNonStringValues']
+
+    if file_data['file_format'] in ['csv', 'tsv', 'xls']:
+        if 'includeFirstRow' in file_data:
+            send_data['includeFirstRow'] = file_data['includeFirstRow']
+        if 'autoGenerateMissingKeys' in file_data:
+            send_data['autoGenerateMissingKeys'] = file_data['autoGenerateMissingKeys']
+        if 'columnDescription' in file_data:
+            send_data['columnDescription'] = file_data['columnDescription']
+        if 'sheetName' in file_data:
+            send_data['sheetName'] = file_data['sheetName']
+
+    return send_data
 
 
 
@@ -491,9 +1083,14 @@ def uploadFile(ctx, file_data, force=False, draft=False):
 
 
 
+@profiling.timed('language lookup')
 def getAllAppLanguages(ctx, projectVersion):
     """Gets all the languages the app has defined
 
+    Only the language codes get read from the response, the entries are
+    skipped while they arrive. The result is cached on disk per project
+    version and branch.
+
     Args:
         ctx: click context
         projectVersion: version to request
@@ -502,6 +1099,21 @@ def getAllAppLanguages(ctx, projectVersion):
         Array of languages
     """
 
+    import requests
+
+    # Commands of the same run share the languages of a version
+    run_languages = ctx.obj.setdefault('app-languages', {})
+    if projectVersion in run_languages:
+        return run_languages[projectVersion]
+
+    cache_key = getLanguageCacheKey(projectVersion)
+    languages = cache.read('languages', cache_key, constants.LANGUAGE_CACHE_TTL)
+    if languages is not None:
+        run_languages[projectVersion] = languages
+        if ctx.obj['DEBUG']:
+            click.secho('\nApp languages from cache: %s' % ', '.join(languages), fg=constants.DEBUG_TEXT_COLOR)
+        return languages
+
     data = {
         'includeDraft': 'false',
         'includeValue' : 'false',
@@ -512,25 +1124,59 @@ def getAllAppLanguages(ctx, projectVersion):
         'version': projectVersion
     }
 
-    response = makeRequest(ctx, data=data)
-    response_data = response.json()
-
-    if 'data' not in response_data:
+    response = makeRequest(ctx, data=data, stream=True)
+    try:
+        languages = json_scan.scanObjectKeys(profiling.timeIterator('transfer', response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)), 'data')
+    except requests.exceptions.RequestException as e:
+        checkDeadline(ctx)
+        raise ApplangaConnectionException('Problem connecting to server. Please check your internet connection.')
+    finally:
+        # Stops the download if the rest of the response is not needed
+        closeResponse(ctx, response)
+
+    if languages is None:
         raise ApplangaRequestException('Response is incomplete. Data property is missing.')
 
-    return response_data['data'].keys();
+    cache.write('languages', cache_key, languages)
+    run_languages[projectVersion] = languages
+
+    return languages
+
+
+
+def getLanguageCacheKey(projectVersion):
+    """Returns what identifies the languages of a project version in the cache."""
+
+    try:
+        config_file_data = config_file.readRaw()
+    except config_file.ApplangaConfigFileNotValidException as e:
+        raise ApplangaRequestException(str(e))
+
+    return {
+        'host': getApiHost(),
+        'app': config_file_data['app']['access_token'].split('!')[0],
+        'branch': config_file_data['app'].get('branch_id'),
+        'version': projectVersion
+    }
 
 
 
 def getProjectVersion(ctx):
     """Gets the latest project version
 
+    The version is requested once per run and then shared by all commands of
+    it. Commands which change the project have to remove 'project-version'
+    from ctx.obj afterwards.
+
     Args:
         ctx: click context
 
     Returns:
         Version number
     """
+    if ctx.obj.get('project-version') is not None:
+        return ctx.obj['project-version']
+
     request_data = {
         'timestamp': time.time()
     }
@@ -541,11 +1187,13 @@ def getProjectVersion(ctx):
     if 'appVersion' not in response_data:
         return 0;
 
+    ctx.obj['project-version'] = response_data['appVersion']
+
     return response_data['appVersion'];
 
 
 
-def makeRequest(ctx, data={}, api_path=None, access_token=None, upload_file=None, method='GET', base_path=constants.API_BASE_PATH):
+def makeRequest(ctx, data={}, api_path=None, access_token=None, upload_file=None, method='GET', base_path=constants.API_BASE_PATH, headers=None, stream=False, target_path=None):
     """Makes a request to Applanga API.
 
     Args:
@@ -556,6 +1204,17 @@ def makeRequest(ctx, data={}, api_path=None, access_token=None, upload_file=None
         upload_file: File to upload with request.
         method: Request method to use.
         base_url: Api base path if specified will overwrite default '/v1/api'
+        headers: Additional request headers. If 'If-None-Match' is set a 304
+            response counts as successful.
+        stream: if true the body of a successful response is not loaded
+            into memory and has to be read with response.iter_content. It
+            has to be closed with closeResponse.
+        target_path: Local file the response gets written to, for the metrics
+            and the trace span.
+
+    Connection errors and the status codes of the retry policy are retried
+    with backoff (POST requests only if enabled in the config file). Every
+    attempt waits for the rate limit of its kind of request if one is set.
 
     Returns:
         API response
@@ -584,20 +1243,16 @@ def makeRequest(ctx, data={}, api_path=None, access_token=None, upload_file=None
     # separate as parameter as needed by API.
     app_id = access_token.split('!')[0]
 
-    headers = {
+    request_headers = {
         'Authorization': 'Bearer ' + access_token,
         'CLI-Version': constants.VERSION_NUMBER,
         'X-Integration': constants.X_INTEGRATION_HEADER_VALUE
     }
+    if headers:
+        request_headers.update(headers)
+    headers = request_headers
 
-    url = constants.APPLANGA_HOST
-
-    env_api_base_url = os.environ.get('APPLANGA_API_HOST')
-
-    if env_api_base_url:
-        url = env_api_base_url
-
-    url = url + base_path
+    url = getApiHost() + base_path
     
 
     if api_path is not None:
@@ -615,21 +1270,161 @@ def makeRequest(ctx, data={}, api_path=None, access_token=None, upload_file=None
         click.secho('  Headers: %s'  % (headers), fg=constants.DEBUG_TEXT_COLOR)
         click.secho('  Data: %s'  % (data), fg=constants.DEBUG_TEXT_COLOR)
 
+    policy = retry.getPolicy(ctx, config_file_data)
+    bucket = rate_limit.getBucket(rate_limit.getBucketName(method, api_path, upload_file), config_file_data)
+    recorder = metrics.get(ctx)
+    record = None
+    if recorder is not None:
+        record = recorder.startRequest(method, base_path + (api_path or ''), data, upload_file or target_path)
+
+    # The request is a child of the current span but does not become the parent of the spans started while it runs
+    request_span = tracing.startSpan('request', {
+        'http.request.method': method,
+        'url.path': base_path + (api_path or ''),
+        'applanga.language': data.get('language', data.get('languages')),
+        'applanga.file.path': upload_file or target_path
+    }, kind=tracing.KIND_CLIENT)
+
+    attempt = 1
+    try:
+        while True:
+            if bucket is not None:
+                waitForRateLimit(ctx, bucket)
+
+            timeout = getTimeout(ctx)
+            try:
+                with profiling.phase('transfer'):
+                    response = sendRequest(ctx, url, data, headers, method, upload_file, stream, timeout)
+            except ApplangaConnectionException as e:
+                # A request which timed out because of the deadline is not worth retrying
+                checkDeadline(ctx)
+                if not policy.canRetry(method, attempt):
+                    raise
+                delay = policy.getDelay(attempt)
+                reason = str(e)
+            else:
+                if not policy.retriesStatus(response.status_code) or not policy.canRetry(method, attempt):
+                    break
+                delay = policy.getDelay(attempt, response.headers.get('Retry-After'))
+                if delay is None:
+                    # The server asked to wait longer than max_retry_after allows
+                    break
+                reason = 'Status code %d' % response.status_code
+                response.close()
+
+            command_deadline = deadline.get(ctx)
+            if command_deadline is not None and delay >= command_deadline.remaining():
+                raise ApplangaDeadlineException(getDeadlineMessage(command_deadline))
+
+            if ctx.obj['DEBUG']:
+                click.secho('\nRetry %d of %d in %.2f seconds: %s' % (attempt, policy.max_attempts - 1, delay, reason), fg=constants.DEBUG_TEXT_COLOR)
+
+            with profiling.phase('retry wait'):
+                time.sleep(delay)
+            attempt += 1
+    except Exception as e:
+        if record is not None:
+            recorder.failRequest(record, e, attempt - 1)
+        request_span.setAttribute('applanga.retries', attempt - 1)
+        request_span.setError(e)
+        request_span.end()
+        raise
+
+    # Number of retries it took, for reporting
+    response.applanga_retries = attempt - 1
+
+    # Streamed responses are done when they get closed, see closeResponse
+    response.applanga_metrics = record
+    response.applanga_span = request_span
+    request_span.setAttributes({'http.response.status_code': response.status_code, 'applanga.retries': response.applanga_retries})
+    if response.status_code not in (200, 304):
+        request_span.setError('Status code %d' % response.status_code)
+    if not stream:
+        finishResponse(ctx, response)
+
+    if ctx.obj['DEBUG']:
+        if stream and response.status_code == 200:
+            # Reading the text here would load the whole body
+            click.secho('\nRequest response: <streamed %s bytes>' % response.headers.get('Content-Length', 'unknown'), fg=constants.DEBUG_TEXT_COLOR)
+        else:
+            click.secho('\nRequest response: %s' % response.text, fg=constants.DEBUG_TEXT_COLOR)
+        click.secho('  Status code: %s'  % (response.status_code), fg=constants.DEBUG_TEXT_COLOR)
+        click.secho('  Retries: %d'  % (response.applanga_retries), fg=constants.DEBUG_TEXT_COLOR)
+
+    if response.status_code == 304 and 'If-None-Match' in headers:
+        # Content did not change since the version with the given ETag
+        return response
+
+    if response.status_code != 200:
+        # Request was not successful so raise exception
+        exception_text = response.text
+        finishResponse(ctx, response)
+
+        try:
+            response_data = response.json()
+            if 'message' in response_data:
+                # There is a message so return it
+                exception_text = response_data['message']
+        except ValueError as e:
+            exception_text = response.text
+
+        # check if it's an authentication error
+        if response.status_code == 403:
+            raise ApplangaAuthenticationException(exception_text)
+        else:
+            exception = ApplangaRequestException('API response: ' + exception_text)
+            exception.status_code = response.status_code
+            raise exception
+
+    # Request was successful so return
+    return response
+
+
+
+def sendRequest(ctx, url, data, headers, method, upload_file=None, stream=False, timeout=None):
+    """Sends a single request to Applanga API and converts connection problems.
+
+    Args:
+        ctx: click context
+        url: The full URL to request.
+        data: Query parameters.
+        headers: Request headers.
+        method: Request method to use.
+        upload_file: File to upload with request.
+        stream: if true the response body is not loaded into memory.
+        timeout: Tuple of connect and read timeout in seconds.
+
+    Returns:
+        The response no matter its status code
+
+    """
+
+    # requests takes long to import so it is only loaded once a request gets sent
+    import requests
+
     if method == 'GET':
         try:
-            response = connection.requestWrap(ctx, 'get', url, params=data, headers=headers)
+            response = connection.requestWrap(ctx, 'get', url, params=data, headers=headers, stream=stream, timeout=timeout)
         except requests.exceptions.SSLError as e:
             raise ApplangaRequestException('Request failed: HTTPS Certificate could not be verified. Potential man in the middle attack. If this is on purpose and you need to use a local certificate please use the --disable-cert-verification flag.')
+        except requests.exceptions.Timeout as e:
+            raise ApplangaConnectionException('Request timed out. The server did not respond in time.')
         except requests.exceptions.ConnectionError as e:
             raise ApplangaConnectionException('Problem connecting to server. Please check your internet connection.')
     else:
         if upload_file:
             try:
                 with open(upload_file, 'rb') as upload_file_content:
+                    # Stream the file instead of building the whole multipart body in memory
+                    upload_body = multipart.MultipartFileEncoder(upload_file, upload_file_content)
+                    upload_headers = dict(headers)
+                    upload_headers['Content-Type'] = upload_body.content_type
                     try:
-                        response = connection.requestWrap(ctx, 'post', url, params=data, headers=headers, files={upload_file: upload_file_content})
+                        response = connection.requestWrap(ctx, 'post', url, params=data, headers=upload_headers, data=upload_body, timeout=timeout)
                     except requests.exceptions.SSLError as e:
                         raise ApplangaRequestException('Request failed: HTTPS Certificate could not be verified. Potential man in the middle attack. If this is on purpose and you need to use a local certificate please use the --disable-cert-verification flag.')
+                    except requests.exceptions.Timeout as e:
+                        raise ApplangaConnectionException('Request timed out. The server did not respond in time.')
                     except requests.exceptions.ConnectionError as e:
                         raise ApplangaConnectionException('Problem connecting to server. Please check your internet connection.')
 
@@ -639,33 +1434,120 @@ def makeRequest(ctx, data={}, api_path=None, access_token=None, upload_file=None
 
         else:
             try:
-                response = connection.requestWrap(ctx, 'post', url, params=data, headers=headers)
+                response = connection.requestWrap(ctx, 'post', url, params=data, headers=headers, timeout=timeout)
             except requests.exceptions.SSLError as e:
                 raise ApplangaRequestException('Request failed: HTTPS Certificate could not be verified. Potential man in the middle attack. If this is on purpose and you need to use a local certificate please use the --disable-cert-verification flag.')
+            except requests.exceptions.Timeout as e:
+                raise ApplangaConnectionException('Request timed out. The server did not respond in time.')
             except requests.exceptions.ConnectionError as e:
                 raise ApplangaConnectionException('Problem connecting to server. Please check your internet connection.')
 
+    return response
+
+
+
+def getTimeout(ctx):
+    """Returns the connect and read timeout for the next request.
+
+    The timeouts are capped by the time left until the deadline of the command.
+
+    Args:
+        ctx: click context
+
+    Returns:
+        Tuple of connect and read timeout in seconds.
+
+    """
+
+    connect_timeout, read_timeout = connection.getDefaultTimeout(ctx)
+
+    command_deadline = deadline.get(ctx)
+    if command_deadline is not None:
+        checkDeadline(ctx)
+        remaining = command_deadline.remaining()
+        connect_timeout = min(connect_timeout, remaining)
+        read_timeout = min(read_timeout, remaining)
+
+    return connect_timeout, read_timeout
+
+
+
+def checkDeadline(ctx):
+    """Raises ApplangaDeadlineException if the deadline of the command passed."""
+    command_deadline = deadline.get(ctx)
+    if command_deadline is not None and command_deadline.expired():
+        raise ApplangaDeadlineException(getDeadlineMessage(command_deadline))
+
+
+
+def getDeadlineMessage(command_deadline):
+    return 'The deadline of %g seconds was reached before the request could finish.' % command_deadline.seconds
+
+
+
+def iterBeforeDeadline(ctx, chunks):
+    """Passes on the chunks of a streamed response until the deadline passes."""
+    for chunk in chunks:
+        checkDeadline(ctx)
+        yield chunk
+
+
+
+def closeResponse(ctx, response):
+    """Closes a response of makeRequest and completes its metrics record and trace span.
+
+    Args:
+        ctx: click context
+        response: The response to close.
+
+    """
+    response.close()
+    finishResponse(ctx, response)
+
+
+
+def finishResponse(ctx, response):
+    """Completes the metrics record and ends the trace span of a response."""
+    record = getattr(response, 'applanga_metrics', None)
+    if record is not None:
+        metrics.get(ctx).finishRequest(record, response)
+
+    request_span = getattr(response, 'applanga_span', None)
+    if request_span is not None:
+        request_span.end()
+
+
+
+def waitForRateLimit(ctx, bucket):
+    """Waits until the rate limit allows to send the next request.
+
+    Args:
+        ctx: click context
+        bucket: The TokenBucket the request counts against.
+
+    """
+
+    delay = bucket.reserve()
+    if not delay:
+        return
+
+    command_deadline = deadline.get(ctx)
+    if command_deadline is not None and delay >= command_deadline.remaining():
+        raise ApplangaDeadlineException(getDeadlineMessage(command_deadline))
+
     if ctx.obj['DEBUG']:
-        click.secho('\nRequest response: %s' % response.text, fg=constants.DEBUG_TEXT_COLOR)
-        click.secho('  Status code: %s'  % (response.status_code), fg=constants.DEBUG_TEXT_COLOR)
+        click.secho('\nRate limit reached, waiting %.2f seconds' % delay, fg=constants.DEBUG_TEXT_COLOR)
 
-    if response.status_code != 200:
-        # Request was not successful so raise exception
-        exception_text = response.text
+    with profiling.phase('rate limit wait'):
+        time.sleep(delay)
 
-        try:
-            response_data = response.json()
-            if 'message' in response_data:
-                # There is a message so return it
-                exception_text = response_data['message']
-        except ValueError as e:
-            exception_text = response.text
 
-        # check if it's an authentication error
-        if response.status_code == 403:
-            raise ApplangaAuthenticationException(exception_text)
-        else:
-            raise ApplangaRequestException('API response: ' + exception_text)
 
-    # Request was successful so return
-    return response
+def getApiHost():
+    """Returns the host of Applanga API. It can be changed with the APPLANGA_API_HOST environment variable."""
+
+    env_api_base_url = os.environ.get('APPLANGA_API_HOST')
+    if env_api_base_url:
+        return env_api_base_url
+
+    return constants.APPLANGA_HOST
@@ -0,0 +1,108 @@
+import json
+import os
+import platform
+import tempfile
+import time
+from lib import lock_file
+
+# Can be set to use a different cache folder or to "off" to disable the cache
+CACHE_DIR_VARIABLE = 'APPLANGA_CACHE_DIR'
+
+
+def getCacheDir():
+    """Returns the folder the CLI caches data of API responses in or None if caching is disabled.
+
+    The folder can be set with the environment variable APPLANGA_CACHE_DIR.
+    Otherwise the user cache folder of the platform is used.
+
+    """
+    cache_dir = os.environ.get(CACHE_DIR_VARIABLE)
+    if cache_dir:
+        if cache_dir.lower() == 'off':
+            return None
+        return cache_dir
+
+    if platform.system() == 'Windows':
+        base_dir = os.environ.get('LOCALAPPDATA')
+    elif platform.system() == 'Darwin':
+        base_dir = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+    if not base_dir:
+        return None
+
+    return os.path.join(base_dir, 'applanga')
+
+
+def getFilePath(name, key):
+    """Returns the path of the cache file for the given key or None if caching is disabled.
+
+    Args:
+        name: Kind of the cached data, it is used as sub folder.
+        key: JSON serializable data which identifies the entry.
+
+    """
+    cache_dir = getCacheDir()
+    if cache_dir is None:
+        return None
+
+    return os.path.join(cache_dir, name, lock_file.hashData(key) + '.json')
+
+
+def read(name, key, ttl):
+    """Reads a cached value.
+
+    Args:
+        name: Kind of the cached data.
+        key: JSON serializable data which identifies the entry.
+        ttl: Maximum age of the entry in seconds.
+
+    Returns:
+        The cached value or None if there is none, it is too old or can not be read.
+
+    """
+    file_path = getFilePath(name, key)
+    if file_path is None:
+        return None
+
+    try:
+        with open(file_path, 'r') as stream:
+            entry = json.load(stream)
+        if not isinstance(entry, dict) or time.time() - entry['created'] > ttl:
+            return None
+        return entry['value']
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        # A missing or broken cache file only means the data gets requested again
+        return None
+
+
+def write(name, key, value):
+    """Stores a value in the cache. Problems writing it are ignored.
+
+    Args:
+        name: Kind of the cached data.
+        key: JSON serializable data which identifies the entry.
+        value: JSON serializable data to store.
+
+    """
+    file_path = getFilePath(name, key)
+    if file_path is None:
+        return
+
+    temp_path = None
+    try:
+        directory = os.path.dirname(file_path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file first so parallel runs never read a half written entry
+        handle, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        with os.fdopen(handle, 'w') as outfile:
+            json.dump({'created': time.time(), 'value': value}, outfile)
+        os.replace(temp_path, file_path)
+        temp_path = None
+    except (IOError, OSError):
+        pass
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
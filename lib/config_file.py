@@ -1,8 +1,15 @@
 import click
 from lib import constants
+from lib import retry
+from lib import rate_limit
+from lib import cache
+from lib import profiling
 import os
 import platform
 import json
+import hashlib
+import threading
+import bisect
 from functools import cmp_to_key
 from pathlib import Path
 
@@ -11,6 +18,14 @@ class ApplangaConfigFileNotValidException(Exception):
     pass
 
 
+# Cache of the config files which passed the validation, see readFile
+VALIDATION_STAMP_CACHE = 'config-validation'
+
+# Parsed and validated config files of this process by path, see readRaw
+_config_cache = {}
+_config_cache_lock = threading.Lock()
+
+
 def getFilePath(current_folder=False):
     """Looks for a config file in current folder, APPLANGA_CONFIG and home directory and returns it.
 
@@ -74,22 +89,70 @@ def write(data):
         click.echo(json_output)
         json.dump(data, outfile, indent=2, sort_keys=True)
 
-        return file_path
+    # Make sure the next read does not return the previous config
+    invalidateCache()
+
+    return file_path
+
+
+def invalidateCache():
+    """Drops all config files cached by readRaw so they get read again on next access."""
+    with _config_cache_lock:
+        _config_cache.clear()
 
 
 def readRaw():
     """Reads the config file and returns its information.
 
+    The parsed and validated config is cached for the whole process as long as
+    the file does not change. All callers share the returned object so it must
+    not be modified.
+
+    Returns:
+        The config file data.
+
+    """
+
+    file_path = getFilePath()
+
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        raise ApplangaConfigFileNotValidException('The config file does not exist. Please initialize the project first with "applanga init"')
+
+    cache_key = (os.path.abspath(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+
+    with _config_cache_lock:
+        cached = _config_cache.get(cache_key[0])
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+
+        config_data = readFile(file_path)
+        _config_cache[cache_key[0]] = (cache_key, config_data)
+
+        return config_data
+
+
+def readFile(file_path):
+    """Reads and validates the config file at the given path.
+
+    The validation gets skipped if the same content was validated by the same
+    CLI version before, see getValidationStampKey.
+
+    Args:
+        file_path: Path of the config file.
+
     Returns:
         The config file data.
 
     """
 
     try:
-        file_path = getFilePath()
         with open(file_path, 'r') as stream:
             try:
-                config_data = json.load(stream)
+                with profiling.phase('config load'):
+                    content = stream.read()
+                    config_data = json.loads(content)
 
                 # Make sure thae config file contains all the needed data
                 if 'app' not in config_data:
@@ -103,31 +166,14 @@ def readRaw():
                     else:
                         raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have an access token set.')
 
-                if 'push' not in config_data['app'] and 'pull' not in config_data['app']:
-                    raise ApplangaConfigFileNotValidException('The config file is not valid. Either a push or pull block has to be set')
-
-                if 'push' in config_data['app']:
-                    if 'source' not in config_data['app']['push']:
-                        raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have source set.')
-                    if 1 > len(config_data['app']['push']['source']):
-                        raise ApplangaConfigFileNotValidException('The config file is not valid. The source does not have any entry.')
-                    if 'path' not in config_data['app']['push']['source'][0]:
-                        raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have source path set under source.')
-                    if 'file_format' not in config_data['app']['push']['source'][0]:
-                        raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have source file_format set under source.')
-
-                if 'pull' in config_data['app']:
-                    if 'target' not in config_data['app']['pull']:
-                        raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have target set.')
-                    if 1 > len(config_data['app']['pull']['target']):
-                        raise ApplangaConfigFileNotValidException('The config file is not valid. The target does not have any entry.')
-                    if 'path' not in config_data['app']['pull']['target'][0]:
-                        raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have target path set under target.')
-                    if 'file_format' not in config_data['app']['pull']['target'][0]:
-                        raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have target file_format set under target.')
-
-                testTagConflict(config_data)
-                
+                stamp_key = getValidationStampKey(content)
+                if cache.read(VALIDATION_STAMP_CACHE, stamp_key, constants.VALIDATION_STAMP_TTL) is None:
+                    validate(config_data)
+                    cache.write(VALIDATION_STAMP_CACHE, stamp_key, True)
+                else:
+                    # The rest of the CLI relies on the order the validation sorts the blocks in
+                    sortBlocks(config_data)
+
                 return config_data
 
             except ValueError as e:
@@ -136,6 +182,88 @@ def readRaw():
         raise ApplangaConfigFileNotValidException('The config file does not exist. Please initialize the project first with "applanga init"')
 
 
+def getValidationStampKey(content):
+    """Returns the key under which the successful validation of a config file gets remembered.
+
+    It changes with the content of the file and with the CLI version, as a new
+    version can validate differently.
+
+    Args:
+        content: The content of the config file.
+
+    """
+    return {
+        'sha256': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+        'version': constants.VERSION_NUMBER
+    }
+
+
+@profiling.timed('validation')
+def validate(config_data):
+    """Checks the structure of the config data and that tags are used only once per language.
+
+    Raises:
+        ApplangaConfigFileNotValidException: If the config data is not valid.
+
+    """
+    if 'push' not in config_data['app'] and 'pull' not in config_data['app']:
+        raise ApplangaConfigFileNotValidException('The config file is not valid. Either a push or pull block has to be set')
+
+    if 'push' in config_data['app']:
+        if 'source' not in config_data['app']['push']:
+            raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have source set.')
+        if 1 > len(config_data['app']['push']['source']):
+            raise ApplangaConfigFileNotValidException('The config file is not valid. The source does not have any entry.')
+        if 'path' not in config_data['app']['push']['source'][0]:
+            raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have source path set under source.')
+        if 'file_format' not in config_data['app']['push']['source'][0]:
+            raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have source file_format set under source.')
+        if 'jobs' in config_data['app']['push'] and not isPositiveInt(config_data['app']['push']['jobs']):
+            raise ApplangaConfigFileNotValidException('The config file is not valid. The jobs property under push has to be a positive number.')
+
+    if 'pull' in config_data['app']:
+        if 'target' not in config_data['app']['pull']:
+            raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have target set.')
+        if 1 > len(config_data['app']['pull']['target']):
+            raise ApplangaConfigFileNotValidException('The config file is not valid. The target does not have any entry.')
+        if 'path' not in config_data['app']['pull']['target'][0]:
+            raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have target path set under target.')
+        if 'file_format' not in config_data['app']['pull']['target'][0]:
+            raise ApplangaConfigFileNotValidException('The config file is not valid. It does not have target file_format set under target.')
+        if 'jobs' in config_data['app']['pull'] and not isPositiveInt(config_data['app']['pull']['jobs']):
+            raise ApplangaConfigFileNotValidException('The config file is not valid. The jobs property under pull has to be a positive number.')
+
+    if 'retry' in config_data['app']:
+        retry_error = retry.validateConfig(config_data['app']['retry'])
+        if retry_error:
+            raise ApplangaConfigFileNotValidException('The config file is not valid. %s' % retry_error)
+
+    if 'discovery_ignore' in config_data['app']:
+        discovery_ignore = config_data['app']['discovery_ignore']
+        if not isinstance(discovery_ignore, list) or not all(isinstance(pattern, str) for pattern in discovery_ignore):
+            raise ApplangaConfigFileNotValidException('The config file is not valid. The discovery_ignore property has to be a list of folder name patterns.')
+
+    if 'rate_limit' in config_data['app']:
+        rate_limit_error = rate_limit.validateConfig(config_data['app']['rate_limit'])
+        if rate_limit_error:
+            raise ApplangaConfigFileNotValidException('The config file is not valid. %s' % rate_limit_error)
+
+    testTagConflict(config_data)
+
+
+def sortBlocks(config_data):
+    """Sorts the push and pull blocks that have the <language> var to the end."""
+    if 'push' in config_data['app']:
+        sortLanguageBlocksLast(config_data['app']['push']['source'])
+    if 'pull' in config_data['app']:
+        sortLanguageBlocksLast(config_data['app']['pull']['target'])
+
+
+def sortLanguageBlocksLast(file_blocks):
+    # to spare us some backend requests sort all entries that have the <language> var to the end so we can compare with statically set langs overlaps
+    file_blocks.sort(key=cmp_to_key(lambda a, b: +1 if 'path' in a and '<language>' in a['path'] else -1 if 'path' in b and '<language>' in b['path'] else 0))
+
+
 #Utiliti claas used to see if a cli target / source block is tackling the same language/path/tag together
 class FileBlock:
     def __init__(self, fileBlockData):
@@ -227,43 +355,122 @@ class FileBlock:
 def tag_to_str(tag):
     return json.dumps(tag)
 
+def isPositiveInt(value):
+    # bool is a subclass of int so it has to be excluded explicitly
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def getTagKeys(block):
+    """Returns the tag values of a block which can overlap with the tags of other blocks."""
+    if isinstance(block.tag, list):
+        return list(dict.fromkeys(block.tag))
+    if block.tag is None:
+        return []
+    return [block.tag]
+
+
+def findTagConflict(blocks):
+    """Returns the first pair of blocks which use the same tag for the same language.
+
+    The blocks are indexed by their tag values so only blocks which share a
+    tag get compared, and if all blocks of a tag have the same tag_category
+    only the ones which can have the same language. The pairs are checked in
+    the same order as comparing every block with every following one, so the
+    same conflict or inconsistent tag_category gets found first.
+
+    Args:
+        blocks: List of FileBlock.
+
+    Returns:
+        Tuple of the indexes of the two blocks or None if there is no conflict.
+
+    Raises:
+        ApplangaConfigFileNotValidException: If blocks use the same tag with different tag_category.
+
+    """
+    try:
+        tag_blocks = {}
+        tag_languages = {}
+        untagged = []
+        for i, block in enumerate(blocks):
+            if block.tag is None:
+                untagged.append(i)
+            for tag in getTagKeys(block):
+                tag_blocks.setdefault(tag, []).append(i)
+                tag_languages.setdefault(tag, {}).setdefault(block.language, []).append(i)
+    except TypeError:
+        # Tags or languages which can not be indexed get compared pair by pair
+        return findTagConflictPairwise(blocks)
+
+    # With inconsistent tag_category any two blocks of the tag are a conflict
+    consistent_tags = set(tag for tag, indexes in tag_blocks.items() if all(blocks[j].tag_category == blocks[indexes[0]].tag_category for j in indexes))
+
+    for i, block in enumerate(blocks):
+        candidates = set()
+        if block.tag is None:
+            # A block without tag only overlaps with blocks which have null in their tag list
+            groups = [tag_blocks.get(None, [])]
+        else:
+            groups = []
+            for tag in getTagKeys(block):
+                if tag is None:
+                    groups.append(untagged)
+                if tag in consistent_tags and block.language is not None:
+                    groups.append(tag_languages[tag].get(block.language, []))
+                    groups.append(tag_languages[tag].get(None, []))
+                else:
+                    groups.append(tag_blocks[tag])
+
+        for group in groups:
+            candidates.update(group[bisect.bisect_right(group, i):])
+
+        for j in sorted(candidates):
+            if block.compare(blocks[j]):
+                return i, j
+
+    return None
+
+
+def findTagConflictPairwise(blocks):
+    """Same as findTagConflict but compares every block with every following one."""
+    for i, blockA in enumerate(blocks):
+        for j in range(i + 1, len(blocks)):
+            if blockA.compare(blocks[j]):
+                return i, j
+    return None
+
+
 def testTagConflict(config_data):
     push_map = {}
     if 'push' in config_data['app']:
-        # to spare us some backend requests sort all entries that have the <language> var to the end so we can compare with statically set langs overlaps
-        config_data['app']['push']['source'].sort(key=cmp_to_key(lambda a, b: +1 if 'path' in a and '<language>' in a['path'] else -1 if 'path' in b and '<language>' in b['path'] else 0))
+        sortLanguageBlocksLast(config_data['app']['push']['source'])
         
         blocks = []
         for push_conf in config_data['app']['push']['source']:
             blocks.append(FileBlock(push_conf))
         
-        for i, blockA in enumerate(blocks):
-            for j, blockB in enumerate(blocks):
-                if i == j or j < i: continue
-                if blockA.compare(blockB):
-                    lang = blockA.language
-                    if lang == None:
-                        lang = "<language>"
-                    
-                    raise ApplangaConfigFileNotValidException('''The tag "{tag}" is used across multiple files for the language "{language}" in your push block. Please ensure tags are unique per file'''.format(tag=blockA.compareTag(blockB), language=lang))
+        conflict = findTagConflict(blocks)
+        if conflict:
+            blockA, blockB = blocks[conflict[0]], blocks[conflict[1]]
+            lang = blockA.language
+            if lang == None:
+                lang = "<language>"
+
+            raise ApplangaConfigFileNotValidException('''The tag "{tag}" is used across multiple files for the language "{language}" in your push block. Please ensure tags are unique per file'''.format(tag=blockA.compareTag(blockB), language=lang))
 
     if 'pull' in config_data['app']:
-        # to spare us some backend requests sort all entries that have the <language> var to the end so we can compare with statically set langs overlaps
-        config_data['app']['pull']['target'].sort(key=cmp_to_key(lambda a, b: +1 if 'path' in a and '<language>' in a['path'] else
-                                                                                -1 if 'path' in b and '<language>' in b['path'] else 0))
+        sortLanguageBlocksLast(config_data['app']['pull']['target'])
         
         blocks = []
         for push_conf in config_data['app']['pull']['target']:
             blocks.append(FileBlock(push_conf))
 
-        for i, blockA in enumerate(blocks):
-            for j, blockB in enumerate(blocks):
-                if i == j or j < i: continue
-                if blockA.compare(blockB):
-                    lang = blockA.language
-                    if lang == None:
-                        lang = "<language>"
-                    raise ApplangaConfigFileNotValidException('''The tag "{tag}" is used across multiple files for the language "{language}" in your pull block. Please ensure tags are unique per file'''.format(tag=blockA.compareTag(blockB), language=lang))
+        conflict = findTagConflict(blocks)
+        if conflict:
+            blockA, blockB = blocks[conflict[0]], blocks[conflict[1]]
+            lang = blockA.language
+            if lang == None:
+                lang = "<language>"
+            raise ApplangaConfigFileNotValidException('''The tag "{tag}" is used across multiple files for the language "{language}" in your pull block. Please ensure tags are unique per file'''.format(tag=blockA.compareTag(blockB), language=lang))
 
 
 
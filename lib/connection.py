@@ -1,11 +1,18 @@
+import threading
+from lib import constants
 
-import urllib3
-import requests
+# One session per process so connections (and the TLS handshakes) get reused
+_session = None
+_session_lock = threading.Lock()
+# Number of connections the pool of the session keeps
+_pool_size = None
 
 # By default the Mozilla Cert list is used then return 'default'
 # if disable-cert-verification is provided return 'none'
 def getCertifcationSetting(ctx):
     if ctx.obj['disable-cert-verification']:
+        import urllib3
+
         # Since we are sending our own warning message disable the one from urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         print("InsecureRequestWarning: Unverified HTTPS request are being made. Disabling certificate verification is strongly discouraged.")
@@ -13,10 +20,95 @@ def getCertifcationSetting(ctx):
     return 'default'
 
 
+def getSession(ctx):
+    """
+    Returns the keep-alive session shared by all requests of this process.
+
+    The session gets created on first use. The certificate setting is applied
+    once to the session and the connection pool is sized with getPoolSize.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+
+    if _session is not None:
+        return _session
+
+    # requests takes long to import so it is only loaded with the first session
+    import requests
+
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            mountAdapter(session, getPoolSize(ctx))
+
+            if getCertifcationSetting(ctx) == 'none':
+                # This disables SSL verification entirely. Use with extreme caution.
+                session.verify = False
+
+            _session = session
+
+    return _session
+
+
+def getPoolSize(ctx):
+    """
+    Returns how many connections the pool keeps.
+
+    That is the 'connection-pool-size' value of the click context, but at
+    least one per parallel job of setJobCount. Otherwise the connections of
+    the other jobs would be dropped after every request.
+    """
+    pool_size = ctx.obj.get('connection-pool-size') or constants.CONNECTION_POOL_SIZE
+    return max(pool_size, ctx.obj.get('connection-jobs') or 1)
+
+
+def mountAdapter(session, pool_size):
+    global _pool_size
+
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    _pool_size = pool_size
+
+
+def setJobCount(ctx, jobs):
+    """
+    Makes sure the connection pool has a connection for each of the given parallel jobs.
+
+    A session which got created with a smaller pool before, e.g. to request
+    the project version, gets a bigger pool.
+    """
+    ctx.obj['connection-jobs'] = max(jobs, ctx.obj.get('connection-jobs') or 1)
+
+    with _session_lock:
+        if _session is not None and getPoolSize(ctx) > _pool_size:
+            mountAdapter(_session, getPoolSize(ctx))
+
+
+def getDefaultTimeout(ctx):
+    """
+    Returns the connect and read timeout of the --connect-timeout and --read-timeout options.
+
+    Returns:
+        Tuple of connect and read timeout in seconds.
+    """
+    connect_timeout = ctx.obj.get('connect-timeout') or constants.CONNECT_TIMEOUT
+    read_timeout = ctx.obj.get('read-timeout') or constants.READ_TIMEOUT
+    return connect_timeout, read_timeout
+
+
 def requestWrap(ctx, method, url, *args, **kwargs):
     """
     Wraps requests.get/post/etc. calls to apply custom SSL certification settings.
 
+    All requests go through the shared session of getSession so connections
+    are pooled and kept alive between calls. Requests without a timeout get
+    the one of getDefaultTimeout so no request can hang forever.
+
     Args:
         method (str): The HTTP method (e.g., 'GET', 'POST', 'PUT', 'DELETE').
         url (str): The URL for the request.
@@ -26,23 +118,20 @@ def requestWrap(ctx, method, url, *args, **kwargs):
     Returns:
         requests.Response: The response object from the request.
     """
-    
-    certificateSetting = getCertifcationSetting(ctx)
 
-    session = None # Initialize session outside of if/elif to potentially reuse
+    session = getSession(ctx)
 
-    if certificateSetting == 'default':
-        # requests.get/post etc. by default use certifi and system CAs
-        # No special session needed unless other common settings are applied
-        pass 
-    elif certificateSetting == 'none':
-        # This disables SSL verification entirely. Use with extreme caution.
-        kwargs['verify'] = False
+    if session.verify is False:
+        # Environment CA bundles (REQUESTS_CA_BUNDLE) would otherwise win over the session setting
+        kwargs.setdefault('verify', False)
+
+    if kwargs.get('timeout') is None:
+        kwargs['timeout'] = getDefaultTimeout(ctx)
 
     # Determine the requests method to call
-    req_method = getattr(session if session else requests, method.lower())
+    req_method = getattr(session, method.lower())
 
     # Make the request
     response = req_method(url, *args, **kwargs)
-    
-    return response
\ No newline at end of file
+
+    return response
@@ -2,9 +2,16 @@ VERSION_NUMBER = '1.0.119'
 APPLANGA_HOST = 'https://api.applanga.com'
 API_BASE_PATH = '/v1/api'
 CONFIG_FILE_NAME = '.applanga.json'
+LOCK_FILE_NAME = '.applanga.lock'
 DEBUG_TEXT_COLOR = 'blue'
 ENVIRONMENT_VARIABLE = 'APPLANGA_CONFIG'
 X_INTEGRATION_HEADER_VALUE = '1'
+CONNECTION_POOL_SIZE = 10
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 300
+LANGUAGE_CACHE_TTL = 3600
+VALIDATION_STAMP_TTL = 30 * 24 * 3600
+DISCOVERY_IGNORE = ['.git', '.hg', '.svn', 'node_modules']
 EXCLUDE_FORMAT_OVERLAP = [['ios_strings', 'ios_stringsdict']]
 FILE_FORMATS = {
     'android_xml': {
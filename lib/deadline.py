@@ -0,0 +1,44 @@
+import time
+
+
+class Deadline:
+    """Time budget for a whole command.
+
+    All requests of the command share the budget. The time left caps the
+    timeouts of every request so the command never runs (much) longer than
+    the given number of seconds.
+
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._expires = time.monotonic() + seconds
+
+    def remaining(self):
+        """Returns the seconds left, negative if the deadline passed already."""
+        return self._expires - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+def start(ctx, seconds):
+    """Starts the deadline of the current command if seconds is set.
+
+    Without seconds a deadline started by a surrounding command (e.g. sync)
+    keeps running.
+
+    Args:
+        ctx: click context
+        seconds: The time budget in seconds or None to run without own deadline.
+
+    """
+    if seconds:
+        ctx.obj['deadline'] = Deadline(seconds)
+    else:
+        ctx.obj.setdefault('deadline', None)
+
+
+def get(ctx):
+    """Returns the Deadline of the current command or None if there is none."""
+    return ctx.obj.get('deadline')
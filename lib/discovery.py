@@ -0,0 +1,135 @@
+import fnmatch
+import os
+import re
+import threading
+
+import glob2
+
+from lib import constants
+
+
+class DiscoveryIndex(glob2.Globber):
+    """Answers the file system queries of glob2 from a shared in-memory index.
+
+    Every directory gets read only once with os.scandir, no matter how many
+    source blocks look into it, and the type of the entries is taken from the
+    scan instead of a stat call per file. Only the directories the patterns
+    lead to get read and the expansion of ** is done once per directory. When
+    expanding ** the directories matching one of the ignore patterns (e.g.
+    .git or node_modules) are skipped, but they can still be part of the path
+    in a block. Apart from that the results are the same as of glob2.glob.
+
+    """
+
+    def __init__(self, ignore=None):
+        ignore_patterns = constants.DISCOVERY_IGNORE + list(ignore or [])
+        self._ignore = re.compile('|'.join(fnmatch.translate(pattern) for pattern in ignore_patterns)) if ignore_patterns else None
+        self._cwd = os.getcwd()
+        self._keys = {}
+        self._directories = {}
+        self._globstar = {}
+        self._lock = threading.Lock()
+
+    def getKey(self, path):
+        """Returns the normalized absolute path the index uses for a path."""
+        key = self._keys.get(path)
+        if key is None:
+            key = os.path.normpath(os.path.join(self._cwd, path))
+            self._keys[path] = key
+        return key
+
+    def scan(self, path):
+        """Returns the entries of a directory as dict of name to tuple of
+        (is directory, is symbolic link) in the order of os.scandir.
+
+        Raises:
+            OSError: if the directory can not be read, like os.listdir does.
+
+        """
+        key = self.getKey(path)
+        entries = self._directories.get(key)
+        if entries is None:
+            try:
+                entries = {}
+                with os.scandir(key) as iterator:
+                    for entry in iterator:
+                        entries[entry.name] = (entry.is_dir(), entry.is_symlink())
+            except OSError as e:
+                entries = e
+            with self._lock:
+                self._directories[key] = entries
+
+        if isinstance(entries, OSError):
+            raise entries
+        return entries
+
+    def getEntry(self, path):
+        """Returns the scan result of a path from the listing of its parent directory.
+
+        Returns:
+            The tuple of (is directory, is symbolic link), None if the path does not
+            exist and False if it can not be looked up in the index.
+
+        """
+        parent, name = os.path.split(path)
+        if not name or name in ('.', '..'):
+            return False
+        try:
+            return self.scan(parent or os.curdir).get(name)
+        except OSError:
+            return False
+
+    def isIgnored(self, name):
+        return self._ignore is not None and self._ignore.match(name) is not None
+
+    def listdir(self, path):
+        return list(self.scan(path))
+
+    def isdir(self, path):
+        entry = self.getEntry(path)
+        if entry is False:
+            return os.path.isdir(path)
+        return entry is not None and entry[0]
+
+    def islink(self, path):
+        entry = self.getEntry(path)
+        if entry is False:
+            return os.path.islink(path)
+        return entry is not None and entry[1]
+
+    def exists(self, path):
+        entry = self.getEntry(path)
+        if entry is False:
+            return os.path.lexists(path)
+        return entry is not None
+
+    def walk(self, top, followlinks=False, sep=None):
+        """Same as glob2.Globber.walk but from the index and without the ignored directories."""
+        try:
+            entries = self.scan(top)
+        except OSError:
+            return
+
+        names = [name for name in entries if not self.isIgnored(name)]
+        yield top, names
+
+        for name in names:
+            is_directory, is_link = entries[name]
+            # glob2 tries to list every entry which is no link, only directories list anything
+            if is_directory and (followlinks or not is_link):
+                for result in self.walk(os.path.join(top, name), followlinks):
+                    yield result
+
+    def resolve_pattern(self, dirname, pattern, globstar_with_root, include_hidden,
+                        norm_paths, case_sensitive, sep):
+        """Same as glob2.Globber.resolve_pattern but with the expansion of ** done once per directory."""
+        if pattern != '**':
+            return glob2.Globber.resolve_pattern(self, dirname, pattern, globstar_with_root, include_hidden, norm_paths, case_sensitive, sep)
+
+        key = (self.getKey(dirname or os.curdir), globstar_with_root, include_hidden, norm_paths, case_sensitive, sep)
+        names = self._globstar.get(key)
+        if names is None:
+            names = glob2.Globber.resolve_pattern(self, dirname, pattern, globstar_with_root, include_hidden, norm_paths, case_sensitive, sep)
+            with self._lock:
+                self._globstar[key] = names
+        return names
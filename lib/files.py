@@ -1,8 +1,9 @@
 import click
-import glob2
 import re
 import copy
 from lib import config_file
+from lib import languages
+from lib import profiling
 
 
 class ApplangaTranslationsException(Exception):
@@ -24,62 +25,28 @@ def convertToWindowsPath(path):
 
 
 
-def convertLanguageName(language_name):
-    """Converts language names into format Applanga API expects.
+def createDiscoveryIndex(ignore=None):
+    """Returns a new DiscoveryIndex, see lib/discovery.py.
 
-    Args:
-        language_name: The language name to convert.
+    glob2 is only imported once files get searched so commands which do not
+    look for files start faster.
 
-    Returns:
-        The converted language or None if conversion was not possible.
+    Args:
+        ignore: Additional directory name patterns to skip when expanding **.
 
     """
-    if '-' in language_name or '_' in language_name:
-        split_name = language_name.split('-')
-        if len(split_name) not in [2, 3]:
-            split_name = language_name.split('_')
-            if len(split_name) not in [2, 3]:
-                # It has to have exactly two or three parts else it is not valid
-                return None
-
-        # handle 2-part codes
-        if len(split_name) == 2:
-            second_part = split_name[1].lower()
-
-            if len(second_part) == 2:
-                # Normally the most have only two letters so return
-                return split_name[0].lower() + '-' + split_name[1].upper()
-            elif len(second_part) == 3 and second_part[0] == 'r':
-                # android prefixes the region with an lowercase r
-                return split_name[0].lower() + '-' + second_part[1:].upper()
-            elif len(second_part) == 4:
-                # Two special cases of 4 letter ones that are supported
-                if second_part == 'hant':
-                    return split_name[0].lower() + '-Hant'
-                elif second_part == 'hans':
-                    return split_name[0].lower() + '-Hans'
-
-        # handle 3-part codes --> example for three lang codes is zh-Hant-HK
-        elif len(split_name) == 3:
-            first_part = split_name[0].lower()
-            second_part = split_name[1]
-            third_part = split_name[2].upper()
-            
-            # check if second part is a script code --> 4 letters like 'Hant', 'Hans'
-            if len(second_part) == 4 and second_part.isalpha():
-                return first_part + '-' + second_part.capitalize() + '-' + third_part
-
-    else:
-        return language_name.lower()
+    from lib import discovery
+    return discovery.DiscoveryIndex(ignore)
 
-    return None
 
 
-def getFiles(source):
+def getFiles(source, index=None):
     """Looks and retruns files which match path in given source block.
 
     Args:
         source: The source block dictionary with path property.
+        index: DiscoveryIndex of createDiscoveryIndex to share between multiple calls. If None the
+            file system is read just for this call.
 
     Returns:
         The found files with language and skipped ones for which no language could be found.
@@ -105,10 +72,15 @@ def getFiles(source):
     else:
         # Language is in path
         search_path = path.replace('<language>', '*')
-        language_regex_path = re.escape(path).replace(r'\*', '.*').replace(re.escape('<language>'), r'([a-zA-Z]{2}([\-\_][a-zA-Z]{2,4})?(?:[\-\_][a-zA-Z]{2})?)')
+        language_regex_path = getLanguageRegex(path)
         uses_placeholder = True
 
-    files = glob2.glob(search_path)
+    if index is None:
+        index = createDiscoveryIndex()
+    with profiling.phase('discovery'):
+        files = index.glob(search_path)
+
+    language_table = languages.getTable()
 
     # Go through all matched files of the current source block and add them
     # according to their language
@@ -117,7 +89,7 @@ def getFiles(source):
 
         if language_regex_path:
             # If a regex is defined try to get language from path
-            file_match = re.search(language_regex_path, file)
+            file_match = language_regex_path.search(file)
             if file_match and len(file_match.groups()):
                 file_language = file_match.group(1)
 
@@ -127,24 +99,8 @@ def getFiles(source):
             file_language = source_language
 
         if file_language:
-            try:
-                config_file_data = config_file.readRaw()
-                reversedDir = dict(map(reversed, config_file_data['languageMap'].items()))
-                # try original
-                if file_language in reversedDir:
-                    file_language = reversedDir[file_language]
-                
-                # arb file fallback: try underscore --> dash since we convert dashes to underscores while pulling
-                elif source['file_format'] == 'arb':
-                    dashed_language = file_language.replace('_', '-')
-                    if dashed_language in reversedDir:
-                        file_language = reversedDir[dashed_language]
-            except (config_file.ApplangaConfigFileNotValidException, KeyError) as e:
-                pass
-            
-                    
-            # Make sure the language name is in the correct format
-            file_language = convertLanguageName(file_language)
+            # Map the language and make sure the language name is in the correct format
+            file_language = language_table.toApplanga(file_language, source.get('file_format'))
 
             if file_language == None:
                 skipped_files.append(file)
@@ -217,3 +173,23 @@ def getFiles(source):
                 'found': return_files,
                 'uses_placeholder': uses_placeholder
             }
+
+
+
+_language_regex_cache = {}
+
+def getLanguageRegex(path):
+    """Returns the compiled regex which finds the language in file paths matching a path with <language> placeholder.
+
+    Args:
+        path: The path of a source block.
+
+    Returns:
+        The compiled regex. Its first group is the language.
+
+    """
+    language_regex = _language_regex_cache.get(path)
+    if language_regex is None:
+        language_regex = re.compile(re.escape(path).replace(r'\*', '.*').replace(re.escape('<language>'), r'([a-zA-Z]{2}([\-\_][a-zA-Z]{2,4})?(?:[\-\_][a-zA-Z]{2})?)'))
+        _language_regex_cache[path] = language_regex
+    return language_regex
@@ -0,0 +1,192 @@
+import json
+import re
+
+# Characters that matter outside of strings and the ones that end or escape a string
+_STRUCTURE = re.compile(rb'["{}\[\]:,]')
+_STRING_END = re.compile(rb'["\\]')
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"')
+_OBJECT = ord('{')
+_NOT_BRACKETS = bytes(c for c in range(256) if c not in b'{}[]')
+
+# Nested values get skipped in pieces of this size, see ObjectKeyScanner._skipNested
+_SKIP_SIZE = 8 * 1024
+
+
+class ObjectKeyScanner:
+    """Collects the keys of one object of a JSON document without parsing the rest.
+
+    The document gets fed in chunks of bytes as they arrive. Only the keys of
+    the object set as property_name of the top level object are kept, all other
+    content is skipped, so memory does not grow with the size of the document.
+    The nested values are only checked for where they start and end, the
+    document is not validated. Values below the wanted keys are skipped with
+    regular expressions in pieces instead of token by token, which makes the
+    scan about as fast as json.loads.
+
+    """
+
+    def __init__(self, property_name):
+        self._property_name = json.dumps(property_name).encode('utf-8')[1:-1]
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string = None
+        self._expect_key = False
+        self._last_key = None
+        self._in_property = False
+
+        self.found = False
+        self.done = False
+        self.keys = []
+
+    def feed(self, chunk):
+        """Scans the next chunk of the document.
+
+        Returns:
+            True as soon as all keys of the object got found.
+
+        """
+        position = 0
+        length = len(chunk)
+        slow_until = 0
+        while position < length and not self.done:
+            if not self._in_string and self._in_property and len(self._stack) > 2 and position >= slow_until:
+                position, slow_until = self._skipNested(chunk, position)
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._collect(chunk[position:position + 1])
+                    self._escape = False
+                    position += 1
+                    continue
+
+                match = _STRING_END.search(chunk, position)
+                if match is None:
+                    self._collect(chunk[position:])
+                    break
+
+                self._collect(chunk[position:match.start()])
+                position = match.end()
+                if match.group() == b'\\':
+                    self._collect(b'\\')
+                    self._escape = True
+                    continue
+
+                self._in_string = False
+                if self._string is not None:
+                    self._addKey(bytes(self._string))
+                    self._string = None
+                continue
+
+            match = _STRUCTURE.search(chunk, position)
+            if match is None:
+                break
+
+            token = match.group()
+            position = match.end()
+            depth = len(self._stack)
+
+            if token == b'"':
+                self._in_string = True
+                self._escape = False
+                # Only the keys of the top level object and of the wanted object are of interest
+                if self._expect_key and (depth == 1 or (depth == 2 and self._in_property)):
+                    self._string = bytearray()
+            elif token in (b'{', b'['):
+                if token == b'{' and depth == 1 and self._last_key == self._property_name:
+                    self._in_property = True
+                    self.found = True
+                self._stack.append(token[0])
+                self._expect_key = token == b'{'
+            elif token in (b'}', b']'):
+                if self._stack:
+                    self._stack.pop()
+                if self._in_property and len(self._stack) == 1:
+                    self._in_property = False
+                    self.done = True
+                self._expect_key = False
+            elif token == b',':
+                self._expect_key = bool(self._stack) and self._stack[-1] == _OBJECT
+            else:
+                self._expect_key = False
+
+        return self.done
+
+    def _skipNested(self, chunk, position):
+        """Skips content below the keys of the wanted object as long as it does not end.
+
+        Returns:
+            Tuple of the position to continue at and until where the content
+            has to be scanned token by token.
+
+        """
+        length = len(chunk)
+        while position < length:
+            end = min(length, position + _SKIP_SIZE)
+            stripped = _STRING.sub(b'', chunk[position:end])
+
+            quote = stripped.find(b'"')
+            if quote >= 0:
+                # A string continues after the piece, everything behind its quote is part of it
+                end -= len(stripped) - quote
+                stripped = stripped[:quote]
+                if end == position:
+                    return position, position + 1
+
+            brackets = stripped.translate(None, _NOT_BRACKETS)
+            closing = brackets.count(b'}') + brackets.count(b']')
+            depth = len(self._stack)
+            if depth - closing < 3:
+                # The piece might close the value of a wanted key, only then it needs a closer look
+                for bracket in brackets:
+                    if bracket in b'{[':
+                        depth += 1
+                    elif depth > 3:
+                        depth -= 1
+                    else:
+                        # The value ends in this piece so the key after it can follow
+                        return position, end
+            else:
+                depth += len(brackets) - 2 * closing
+
+            # Below the wanted keys only the depth matters, not if it is an object or array
+            self._stack = self._stack[:2] + [_OBJECT] * (depth - 2)
+            self._expect_key = False
+            position = end
+
+        return position, position
+
+    def _collect(self, data):
+        if self._string is not None:
+            self._string += data
+
+    def _addKey(self, raw_key):
+        if len(self._stack) == 1:
+            self._last_key = raw_key
+        else:
+            self.keys.append(json.loads(b'"' + raw_key + b'"'))
+
+
+def scanObjectKeys(chunks, property_name):
+    """Returns the keys of the object in property_name of a JSON document.
+
+    Reading stops as soon as the object is complete.
+
+    Args:
+        chunks: Iterable of the document in bytes.
+        property_name: Name of the property of the top level object.
+
+    Returns:
+        List of the keys in document order or None if the property is not an object in the document.
+
+    """
+    scanner = ObjectKeyScanner(property_name)
+    for chunk in chunks:
+        if scanner.feed(chunk):
+            break
+
+    if not scanner.found:
+        return None
+
+    return scanner.keys
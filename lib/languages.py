@@ -0,0 +1,191 @@
+import functools
+import threading
+from lib import config_file
+
+# File formats with own naming rules for language codes in file names
+NAMING_RULE_FORMATS = ['android_xml', 'arb']
+
+# Number of resolved codes which are not in the languageMap kept per direction
+UNKNOWN_CODES_CACHE_SIZE = 1024
+
+# Table of the current config file, see getTable
+_table = None
+_table_lock = threading.Lock()
+
+
+def convertLanguageName(language_name):
+    """Converts language names into format Applanga API expects.
+
+    Args:
+        language_name: The language name to convert.
+
+    Returns:
+        The converted language or None if conversion was not possible.
+
+    """
+    if '-' in language_name or '_' in language_name:
+        split_name = language_name.split('-')
+        if len(split_name) not in [2, 3]:
+            split_name = language_name.split('_')
+            if len(split_name) not in [2, 3]:
+                # It has to have exactly two or three parts else it is not valid
+                return None
+
+        # handle 2-part codes
+        if len(split_name) == 2:
+            second_part = split_name[1].lower()
+
+            if len(second_part) == 2:
+                # Normally the most have only two letters so return
+                return split_name[0].lower() + '-' + split_name[1].upper()
+            elif len(second_part) == 3 and second_part[0] == 'r':
+                # android prefixes the region with an lowercase r
+                return split_name[0].lower() + '-' + second_part[1:].upper()
+            elif len(second_part) == 4:
+                # Two special cases of 4 letter ones that are supported
+                if second_part == 'hant':
+                    return split_name[0].lower() + '-Hant'
+                elif second_part == 'hans':
+                    return split_name[0].lower() + '-Hans'
+
+        # handle 3-part codes --> example for three lang codes is zh-Hant-HK
+        elif len(split_name) == 3:
+            first_part = split_name[0].lower()
+            second_part = split_name[1]
+            third_part = split_name[2].upper()
+
+            # check if second part is a script code --> 4 letters like 'Hant', 'Hans'
+            if len(second_part) == 4 and second_part.isalpha():
+                return first_part + '-' + second_part.capitalize() + '-' + third_part
+
+    else:
+        return language_name.lower()
+
+    return None
+
+
+
+def getNamingRule(file_format):
+    """Returns the file format whose naming rules apply or None if language codes are used as they are."""
+    if file_format in NAMING_RULE_FORMATS:
+        return file_format
+    return None
+
+
+
+class LanguageTable:
+    """Resolves language codes between Applanga and local file names in both directions.
+
+    The results for all languages of the languageMap get computed once when
+    the table is created, so resolving them is a single dict lookup. Codes
+    which are not in the languageMap get resolved on first use and are then
+    kept in a LRU cache.
+
+    """
+
+    def __init__(self, language_map=None):
+        self.language_map = dict(language_map or {})
+        self.reversed_map = dict(map(reversed, self.language_map.items()))
+
+        self._to_applanga = {}
+        self._to_local = {}
+        for naming_rule in [None] + NAMING_RULE_FORMATS:
+            for local_name in self.reversed_map:
+                self._to_applanga[(local_name, naming_rule)] = self._convertToApplanga(local_name, naming_rule)
+            for language in self.language_map:
+                self._to_local[(language, naming_rule)] = self._convertToLocal(language, naming_rule)
+
+        self._cachedToApplanga = functools.lru_cache(maxsize=UNKNOWN_CODES_CACHE_SIZE)(self._convertToApplanga)
+        self._cachedToLocal = functools.lru_cache(maxsize=UNKNOWN_CODES_CACHE_SIZE)(self._convertToLocal)
+
+    def toApplanga(self, file_language, file_format=None):
+        """Returns the Applanga language code for a language found in a local file path.
+
+        Args:
+            file_language: The language as it is in the file path.
+            file_format: The file format of the file.
+
+        Returns:
+            The language code or None if conversion was not possible.
+
+        """
+        key = (file_language, getNamingRule(file_format))
+        language = self._to_applanga.get(key)
+        if language is None:
+            language = self._cachedToApplanga(*key)
+        return language
+
+    def toLocal(self, language, file_format=None):
+        """Returns the names a language of Applanga gets in local file paths.
+
+        Args:
+            language: The Applanga language code.
+            file_format: The file format of the file.
+
+        Returns:
+            Tuple of the name to use in the file path and its variant with an
+            underscore instead of the dash.
+
+        """
+        key = (language, getNamingRule(file_format))
+        local_names = self._to_local.get(key)
+        if local_names is None:
+            local_names = self._cachedToLocal(*key)
+        return local_names
+
+    def _convertToApplanga(self, file_language, naming_rule):
+        if file_language in self.reversed_map:
+            file_language = self.reversed_map[file_language]
+
+        # arb file fallback: try underscore --> dash since we convert dashes to underscores while pulling
+        elif naming_rule == 'arb':
+            dashed_language = file_language.replace('_', '-')
+            if dashed_language in self.reversed_map:
+                file_language = self.reversed_map[dashed_language]
+
+        # Make sure the language name is in the correct format
+        return convertLanguageName(file_language)
+
+    def _convertToLocal(self, language, naming_rule):
+        if self.language_map.get(language):
+            language = self.language_map[language]
+
+        # android_xml and arb files have special files naming conventions
+        # nb-NO.android_xml to nb-rNO.android.xml
+        # nb-NO.arb to nb_NO.arb
+        language_ = language.replace('-', '_')
+        if naming_rule == 'android_xml' and len(language) == 5:
+            language = language.replace('-', '-r')
+
+        if naming_rule == 'arb' and len(language) >= 5:
+            language = language_
+
+        return language, language_
+
+
+
+def getTable():
+    """Returns the LanguageTable for the languageMap of the config file.
+
+    The table gets built once and is shared by push and pull until the config
+    file changes.
+
+    Returns:
+        The LanguageTable, without mapped languages if the config file can not be read.
+
+    """
+    global _table
+
+    try:
+        config_file_data = config_file.readRaw()
+    except config_file.ApplangaConfigFileNotValidException:
+        config_file_data = None
+
+    with _table_lock:
+        if _table is None or _table[0] is not config_file_data:
+            language_map = config_file_data.get('languageMap') if config_file_data else None
+            if not isinstance(language_map, dict):
+                language_map = None
+            _table = (config_file_data, LanguageTable(language_map))
+
+        return _table[1]
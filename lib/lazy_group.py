@@ -0,0 +1,43 @@
+import importlib
+
+import click
+
+
+class LazyGroup(click.Group):
+    """Click group which imports the module of a command only when the command gets used.
+
+    The commands are given as dict of command name to the import path of the
+    command, e.g. {'pull': 'commands.pull.pull'}. So running one command or
+    only --version does not import the modules of all the others, and with
+    them requests and the other libraries they use.
+
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            self.add_command(loadCommand(self.lazy_commands[cmd_name]), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+def loadCommand(import_path):
+    """Imports a command.
+
+    Args:
+        import_path: Module and name of the command separated by a dot, e.g. 'commands.pull.pull'.
+
+    Returns:
+        The click command.
+
+    """
+    module_name, command_name = import_path.rsplit('.', 1)
+    command = getattr(importlib.import_module(module_name), command_name)
+    if not isinstance(command, click.Command):
+        raise ValueError('%s is no click command' % import_path)
+    return command
@@ -0,0 +1,128 @@
+import json
+import os
+import hashlib
+import tempfile
+import threading
+from lib import constants
+
+
+class LockFile:
+    """Remembers what got transferred in previous runs so unchanged files can be skipped.
+
+    The data is stored as JSON with one section per command (e.g. 'pull') and
+    one entry per local file path inside each section. Entries can be read and
+    written from multiple worker threads.
+
+    """
+
+    def __init__(self, file_path, data=None):
+        self.file_path = file_path
+        self.data = data or {}
+        self.changed = False
+        self._lock = threading.Lock()
+
+    def get(self, section, key):
+        with self._lock:
+            return self.data.get(section, {}).get(key)
+
+    def set(self, section, key, entry):
+        with self._lock:
+            self.data.setdefault(section, {})[key] = entry
+            self.changed = True
+
+    def save(self):
+        """Writes the lock file if any entry changed. The file gets replaced atomically."""
+        with self._lock:
+            if not self.changed:
+                return
+
+            directory = os.path.dirname(os.path.abspath(self.file_path))
+            handle, temp_path = tempfile.mkstemp(prefix=constants.LOCK_FILE_NAME, dir=directory)
+            try:
+                with os.fdopen(handle, 'w') as outfile:
+                    json.dump(self.data, outfile, indent=2, sort_keys=True)
+                os.replace(temp_path, self.file_path)
+            except Exception:
+                os.remove(temp_path)
+                raise
+
+            self.changed = False
+
+
+def getFilePath():
+    """Returns the path of the lock file. It is always stored in the current folder
+    as the paths in the config file are relative to it."""
+    return os.path.join(os.getcwd(), constants.LOCK_FILE_NAME)
+
+
+def read():
+    """Reads the lock file of the current folder.
+
+    Returns:
+        The LockFile. It is empty if no lock file exists yet or it can not be parsed.
+
+    """
+    file_path = getFilePath()
+
+    data = {}
+    try:
+        with open(file_path, 'r') as stream:
+            data = json.load(stream)
+        if not isinstance(data, dict):
+            data = {}
+    except (IOError, ValueError):
+        # A missing or broken lock file only means that everything gets transferred again
+        pass
+
+    return LockFile(file_path, data)
+
+
+def hashFile(file_path):
+    """Returns the sha256 hex digest of a file or None if it can not be read."""
+    sha = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as stream:
+            for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+                sha.update(chunk)
+    except (IOError, OSError):
+        return None
+    return sha.hexdigest()
+
+
+def hashData(data):
+    """Returns the sha256 hex digest of JSON serializable data independent of key order."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def fileMatches(entry, file_path):
+    """Checks if the local file still has the content recorded in the lock entry.
+
+    A matching size and modification time is trusted, otherwise the content hash is compared.
+
+    """
+    if not entry or 'sha256' not in entry:
+        return False
+
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return False
+
+    if file_stat.st_size == entry.get('size') and file_stat.st_mtime_ns == entry.get('mtime'):
+        return True
+
+    return hashFile(file_path) == entry['sha256']
+
+
+def getRecordedSize(lock, section, key):
+    """Returns the file size recorded for a lock file entry by a previous run or None."""
+    if lock is None:
+        return None
+    entry = lock.get(section, key)
+    return entry.get('size') if entry else None
+
+
+def fileStat(file_path):
+    """Returns the size and modification time of a file as stored in lock entries."""
+    file_stat = os.stat(file_path)
+    return {'size': file_stat.st_size, 'mtime': file_stat.st_mtime_ns}
@@ -0,0 +1,211 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+# Endpoints whose successful requests transfer a single file
+FILE_ENDPOINTS = ['/v1/api/files']
+
+
+class MetricsRecorder:
+    """Collects a record of every request to Applanga API made by api.makeRequest.
+
+    A record is started before the first attempt of a request and finished
+    once its response is done, for streamed downloads that is when the
+    response gets closed after the file got written.
+
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._started_monotonic = time.monotonic()
+        self.records = []
+        self._lock = threading.Lock()
+
+    def startRequest(self, method, path, data, target_path=None):
+        """Starts the record of a request.
+
+        Args:
+            method: Request method.
+            path: Path of the URL without host.
+            data: Query parameters of the request.
+            target_path: Local file which gets uploaded or downloaded.
+
+        Returns:
+            The record to pass to finishRequest or failRequest.
+
+        """
+        return {
+            'endpoint': path,
+            'method': method,
+            'language': data.get('language', data.get('languages')),
+            'target_path': target_path,
+            'status': None,
+            'error': None,
+            'bytes_sent': 0,
+            'bytes_received': 0,
+            'time_to_first_byte': None,
+            'seconds': None,
+            'retries': 0,
+            'files': 0,
+            'start': time.monotonic() - self._started_monotonic,
+            '_started': time.monotonic(),
+            '_done': False
+        }
+
+    def finishRequest(self, record, response):
+        """Completes the record of a request with its response. Later calls are ignored."""
+        if record['_done']:
+            return
+
+        record['status'] = response.status_code
+        record['retries'] = getattr(response, 'applanga_retries', 0)
+        record['time_to_first_byte'] = response.elapsed.total_seconds()
+        record['bytes_sent'] = getBodySize(response.request.body)
+        record['bytes_received'] = getReceivedBytes(response)
+        if response.status_code in (200, 304) and record['endpoint'] in FILE_ENDPOINTS and record['files'] == 0:
+            record['files'] = 1
+        self.addRecord(record)
+
+    def failRequest(self, record, exception, retries=0):
+        """Completes the record of a request which did not get a response."""
+        if record['_done']:
+            return
+
+        record['error'] = str(exception)
+        record['retries'] = retries
+        self.addRecord(record)
+
+    def addRecord(self, record):
+        record['_done'] = True
+        record['seconds'] = time.monotonic() - record.pop('_started')
+        with self._lock:
+            self.records.append(record)
+
+    def getSummary(self):
+        """Returns the aggregate numbers of all finished requests."""
+        with self._lock:
+            records = list(self.records)
+
+        seconds = time.monotonic() - self._started_monotonic
+        files = sum(record['files'] for record in records)
+        bytes_total = sum(record['bytes_sent'] + record['bytes_received'] for record in records)
+
+        endpoints = {}
+        for record in records:
+            endpoints.setdefault('%s %s' % (record['method'], record['endpoint']), []).append(record)
+
+        return {
+            'seconds': seconds,
+            'requests': len(records),
+            'errors': len([record for record in records if isError(record)]),
+            'retries': sum(record['retries'] for record in records),
+            'files': files,
+            'files_per_second': files / seconds if seconds else None,
+            'bytes_sent': sum(record['bytes_sent'] for record in records),
+            'bytes_received': sum(record['bytes_received'] for record in records),
+            'mb_per_second': bytes_total / 1024.0 / 1024.0 / seconds if seconds else None,
+            'endpoints': dict((name, getEndpointSummary(endpoint_records)) for name, endpoint_records in endpoints.items())
+        }
+
+    def write(self, file_path):
+        """Writes the records and the summary as JSON, replacing the file atomically."""
+        with self._lock:
+            records = [dict((key, value) for key, value in record.items() if not key.startswith('_')) for record in self.records]
+
+        data = {
+            'started': self.started,
+            'summary': self.getSummary(),
+            'requests': sorted(records, key=lambda record: record['start'])
+        }
+
+        directory = os.path.dirname(os.path.abspath(file_path))
+        handle, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(handle, 'w') as outfile:
+                json.dump(data, outfile, indent=2)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+def isError(record):
+    return record['error'] is not None or record['status'] not in (200, 304)
+
+
+def getEndpointSummary(records):
+    seconds = [record['seconds'] for record in records]
+    time_to_first_byte = [record['time_to_first_byte'] for record in records if record['time_to_first_byte'] is not None]
+    return {
+        'requests': len(records),
+        'errors': len([record for record in records if isError(record)]),
+        'retries': sum(record['retries'] for record in records),
+        'bytes_sent': sum(record['bytes_sent'] for record in records),
+        'bytes_received': sum(record['bytes_received'] for record in records),
+        'seconds': {
+            'p50': getPercentile(seconds, 50),
+            'p95': getPercentile(seconds, 95),
+            'p99': getPercentile(seconds, 99),
+            'max': max(seconds)
+        },
+        'time_to_first_byte': {
+            'p50': getPercentile(time_to_first_byte, 50),
+            'p95': getPercentile(time_to_first_byte, 95),
+            'p99': getPercentile(time_to_first_byte, 99)
+        }
+    }
+
+
+def getPercentile(values, percentile):
+    """Returns the nearest-rank percentile of the values or None if there are none.
+
+    The nearest rank is the smallest value which at least the given percent
+    of the values are less than or equal to.
+
+    >>> getPercentile(range(1, 101), 95)
+    95
+    >>> getPercentile(range(1, 101), 99)
+    99
+    >>> getPercentile([1, 2], 50)
+    1
+    >>> getPercentile(range(1, 11), 50)
+    5
+    >>> getPercentile(range(1, 21), 95)
+    19
+    >>> getPercentile([3], 99)
+    3
+
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(percentile * len(ordered) / 100.0) - 1)
+    return ordered[index]
+
+
+def getBodySize(body):
+    if body is None:
+        return 0
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+def getReceivedBytes(response):
+    """Returns the number of body bytes read so far, as they came over the network."""
+    raw = getattr(response, 'raw', None)
+    if raw is not None and hasattr(raw, 'tell'):
+        try:
+            return raw.tell()
+        except (OSError, ValueError):
+            pass
+    return 0
+
+
+def get(ctx):
+    """Returns the MetricsRecorder of the run or None if no metrics are collected."""
+    return ctx.obj.get('metrics')
@@ -0,0 +1,70 @@
+import os
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class MultipartFileEncoder:
+    """Streams a multipart/form-data body with a single file field.
+
+    The body is the same requests builds for files={field_name: file} but the
+    file content is read in chunks while sending instead of being loaded into
+    memory first. It can be passed as data to requests which then sends it with
+    a Content-Length header.
+
+    """
+
+    def __init__(self, field_name, file_object, boundary=None):
+        """
+        Args:
+            field_name: Name of the form field.
+            file_object: File opened in binary mode. The file name is taken from its name.
+            boundary: Multipart boundary, a random one is used by default.
+        """
+        from urllib3.fields import RequestField
+        from urllib3.filepost import choose_boundary
+
+        self.boundary = boundary or choose_boundary()
+        self.content_type = 'multipart/form-data; boundary=%s' % self.boundary
+
+        field = RequestField(name=field_name, data=b'', filename=os.path.basename(file_object.name))
+        field.make_multipart()
+
+        head = ('--%s\r\n' % self.boundary).encode('latin-1') + field.render_headers().encode('utf-8')
+        tail = ('\r\n--%s--\r\n' % self.boundary).encode('latin-1')
+
+        file_size = os.fstat(file_object.fileno()).st_size - file_object.tell()
+        self._length = len(head) + file_size + len(tail)
+        self._parts = [head, file_object, tail]
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length
+
+        chunks = []
+        while size > 0 and self._parts:
+            part = self._parts[0]
+            if isinstance(part, bytes):
+                chunk = part[:size]
+                if len(part) > size:
+                    self._parts[0] = part[size:]
+                else:
+                    self._parts.pop(0)
+            else:
+                chunk = part.read(size)
+                if not chunk:
+                    self._parts.pop(0)
+                    continue
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return b''.join(chunks)
@@ -1,4 +1,8 @@
 import click
+import contextlib
+import json
+import sys
+from lib import profiling
 
 def showCommandHeader(command_name, ctx):
     """Displays basic information to user.
@@ -26,4 +30,47 @@ def abort_if_fail_on_error(ctx, fail_on_error, message=None):
 
     if message:
         click.secho(message, err=True, fg='red')
-    ctx.exit(1)
\ No newline at end of file
+    ctx.exit(1)
+
+
+def show_deadline_summary(ctx, finished, cancelled):
+    """Shows how many files got done before the deadline of the command was reached."""
+    click.secho(
+        '\nThe deadline of %g seconds was reached. Finished files: %d, cancelled files: %d'
+        % (ctx.obj['deadline'].seconds, finished, cancelled),
+        err=True,
+        fg='red'
+    )
+
+
+def start_plan(ctx, plan):
+    """Sends everything the command prints to stderr if it only prints its work plan.
+
+    So stdout of --plan is nothing but the JSON of show_plan, even with
+    --debug or when there are problems with the config.
+
+    Args:
+        ctx: Context of the command, stdout is restored once it is done.
+        plan: The --plan option of the command.
+
+    """
+    if not plan:
+        return
+
+    ctx.obj['plan_stdout'] = sys.stdout
+    ctx.with_resource(contextlib.redirect_stdout(sys.stderr))
+
+
+def show_plan(ctx, plan):
+    """Prints the work plan of a command as JSON."""
+    click.echo(json.dumps(plan, indent=2), file=ctx.obj.get('plan_stdout'))
+
+
+def show_profile(profiler):
+    """Stops the profiler and shows how much time the phases of the run took."""
+    profiler.stop()
+    click.echo('', err=True)
+    for line in profiling.getReport(profiler):
+        click.echo(line, err=True)
+    if profiler.output_path:
+        click.echo('  Profile written to: %s (%s)' % (profiler.output_path, profiler.output_format), err=True)
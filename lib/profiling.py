@@ -0,0 +1,269 @@
+import functools
+import os
+import sys
+import threading
+import time
+
+PROFILE_FORMATS = ['pstats', 'collapsed']
+
+# Seconds between two samples of the stacks for the collapsed format
+SAMPLE_INTERVAL = 0.002
+
+# Active PhaseTimer, None while profiling is off so phases cost only this check
+_timer = None
+
+
+class PhaseTimer:
+    """Measures the wall clock time spent in the phases of a run.
+
+    Phases can be nested. The total time of a phase includes the phases
+    started inside of it, its self time does not. So the self times of all
+    phases add up to the time that got measured. Phases of parallel jobs run
+    at the same time so their sums can be bigger than the run time, but not
+    bigger than the run time plus the time worker threads spent in phases.
+
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        # Time spent in the outermost phases of threads other than the main thread
+        self.worker_seconds = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def getStack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def enter(self, name):
+        self.getStack().append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        stack = self.getStack()
+        name, started, child_seconds = stack.pop()
+        seconds = time.perf_counter() - started
+        if stack:
+            stack[-1][2] += seconds
+
+        # A phase started inside the same phase is already part of its total
+        outermost = all(frame[0] != name for frame in stack)
+
+        with self._lock:
+            phase = self.phases.setdefault(name, {'calls': 0, 'total': 0.0, 'self': 0.0})
+            phase['calls'] += 1
+            if outermost:
+                phase['total'] += seconds
+            phase['self'] += seconds - child_seconds
+            if not stack and threading.current_thread() is not threading.main_thread():
+                self.worker_seconds += seconds
+
+    def getElapsed(self):
+        return time.perf_counter() - self.started
+
+
+class Phase:
+    def __init__(self, timer, name):
+        self._timer = timer
+        self._name = name
+
+    def __enter__(self):
+        self._timer.enter(self._name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._timer.exit()
+        return False
+
+
+class NoPhase:
+    """Stands in for Phase while profiling is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_PHASE = NoPhase()
+
+
+def phase(name):
+    """Returns a context manager which adds the time spent in it to the given phase."""
+    if _timer is None:
+        return _NO_PHASE
+    return Phase(_timer, name)
+
+
+def timed(name):
+    """Decorator which adds the time spent in the function to the given phase."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _timer is None:
+                return function(*args, **kwargs)
+            with Phase(_timer, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timeIterator(name, iterable):
+    """Returns the iterable with the time spent waiting for each item added to the given phase."""
+    if _timer is None:
+        return iterable
+    return _timeIterator(_timer, name, iterable)
+
+
+def _timeIterator(timer, name, iterable):
+    iterator = iter(iterable)
+    while True:
+        timer.enter(name)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timer.exit()
+        yield item
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of all threads and counts them in the collapsed format of flamegraph tools."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.counts = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, 'thread-%d' % thread_id))
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, file_path):
+        with open(file_path, 'w') as outfile:
+            for stack, count in sorted(self.counts.items()):
+                outfile.write('%s %d\n' % (stack, count))
+
+
+class ThreadProfiles:
+    """Runs cProfile in the main thread and in every thread started while it is active."""
+
+    def __init__(self):
+        # cProfile and pstats are only imported when they are used to keep the start of the CLI fast
+        import cProfile
+
+        self.profiles = []
+        self._profile_class = cProfile.Profile
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.setprofile(self._startThread)
+        self._startProfile()
+
+    def _startThread(self, frame, event, arg):
+        # Called for the first event of a new thread, the profile replaces this hook
+        self._startProfile()
+
+    def _startProfile(self):
+        profile = self._profile_class()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def stop(self):
+        threading.setprofile(None)
+        # Threads of the run are done by now, only the current one is still profiled
+        for profile in self.profiles:
+            profile.disable()
+
+    def write(self, file_path):
+        import pstats
+
+        stats = pstats.Stats(self.profiles[0])
+        for profile in self.profiles[1:]:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # A thread which did not call any function has no stats
+                pass
+        stats.dump_stats(file_path)
+
+
+class Profiler:
+    """Profiling of a whole run, see start."""
+
+    def __init__(self, output_path=None, output_format='pstats'):
+        self.output_path = output_path
+        self.output_format = output_format
+        self.timer = PhaseTimer()
+        self.collector = None
+        if output_path:
+            self.collector = StackSampler() if output_format == 'collapsed' else ThreadProfiles()
+
+    def stop(self):
+        global _timer
+        _timer = None
+        if self.collector is not None:
+            self.collector.stop()
+            self.collector.write(self.output_path)
+
+
+def start(output_path=None, output_format='pstats'):
+    """Starts to measure the phases of the run.
+
+    Args:
+        output_path: File to write a cProfile dump or the sampled stacks to, None for only the phases.
+        output_format: One of PROFILE_FORMATS. pstats writes the cProfile data
+            of all threads for pstats or snakeviz, collapsed writes sampled
+            stacks for flamegraph tools.
+
+    Returns:
+        The started Profiler.
+
+    """
+    global _timer
+    profiler = Profiler(output_path, output_format)
+    _timer = profiler.timer
+    if profiler.collector is not None:
+        profiler.collector.start()
+    return profiler
+
+
+def getReport(profiler):
+    """Returns the measured phases as lines of a table, the slowest first."""
+    elapsed = profiler.timer.getElapsed()
+    thread_time = elapsed + profiler.timer.worker_seconds
+    lines = [
+        'Profile (wall clock seconds summed over all threads, self excludes nested phases):',
+        '  %-18s %7s %10s %10s %7s' % ('Phase', 'Calls', 'Total', 'Self', 'Self %')
+    ]
+    phases = sorted(profiler.timer.phases.items(), key=lambda item: item[1]['self'], reverse=True)
+    for name, phase_data in phases:
+        # Share of the thread time so parallel jobs do not add up to more than 100%
+        share = 100.0 * phase_data['self'] / thread_time if thread_time else 0
+        lines.append('  %-18s %7d %10.3f %10.3f %6.1f%%' % (name, phase_data['calls'], phase_data['total'], phase_data['self'], share))
+    lines.append('  Run time: %.3f' % elapsed)
+    if profiler.timer.worker_seconds:
+        lines.append('  Thread time: %.3f (Self %% is relative to it)' % thread_time)
+    return lines
@@ -0,0 +1,110 @@
+import threading
+import time
+
+BUCKET_NAMES = ['download', 'upload', 'metadata']
+
+# Buckets are shared by all workers of the process, see getBucket
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Limits how many requests get sent per second.
+
+    The bucket holds up to burst tokens and gets refilled with rate tokens per
+    second. Every request takes one token. If none is left the request has to
+    wait until its token got refilled. Waiting requests reserve their token
+    right away so they get served in the order they arrived.
+
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token and returns the seconds to wait before it may be used."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self.rate
+
+
+def validateConfig(rate_limit_config):
+    """Checks the rate_limit block of the config file.
+
+    Returns:
+        An error message or None if the block is valid.
+
+    """
+    if not isinstance(rate_limit_config, dict):
+        return 'The rate_limit property has to be an object.'
+
+    for name, bucket_config in rate_limit_config.items():
+        if name not in BUCKET_NAMES:
+            return 'The rate_limit property does not support "%s". Supported are: %s' % (name, ', '.join(BUCKET_NAMES))
+
+        if not isinstance(bucket_config, dict):
+            return 'The rate_limit property %s has to be an object.' % name
+
+        for key in bucket_config:
+            if key not in ['rps', 'burst']:
+                return 'The rate_limit property %s does not support "%s".' % (name, key)
+
+        rps = bucket_config.get('rps')
+        if not isinstance(rps, (int, float)) or isinstance(rps, bool) or rps <= 0:
+            return 'The rate_limit property %s needs rps set to a positive number.' % name
+
+        if 'burst' in bucket_config:
+            burst = bucket_config['burst']
+            if not isinstance(burst, int) or isinstance(burst, bool) or burst < 1:
+                return 'The rate_limit property %s needs burst set to a positive number.' % name
+
+    return None
+
+
+def getBucketName(method, api_path, upload_file=None):
+    """Returns which bucket a request to Applanga API counts against."""
+    if upload_file or method != 'GET':
+        return 'upload'
+    if api_path in ['/files', '/files/bulk']:
+        return 'download'
+    return 'metadata'
+
+
+def getBucket(name, config_file_data=None):
+    """Returns the bucket with the given name configured in the rate_limit block of the config file.
+
+    Args:
+        name: One of BUCKET_NAMES.
+        config_file_data: The config file data or None if not available.
+
+    Returns:
+        The TokenBucket shared by the whole process or None if the requests are not limited.
+
+    """
+    if not config_file_data or 'rate_limit' not in config_file_data['app']:
+        return None
+
+    bucket_config = config_file_data['app']['rate_limit'].get(name)
+    if not bucket_config:
+        return None
+
+    rate = bucket_config['rps']
+    # By default allow to send the requests of one second at once
+    burst = bucket_config.get('burst', max(1, int(rate)))
+
+    key = (name, rate, burst)
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(rate, burst)
+        return _buckets[key]
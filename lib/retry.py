@@ -0,0 +1,147 @@
+import random
+import time
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+# Longest Retry-After of the server which is waited for before a retry
+DEFAULT_MAX_RETRY_AFTER = 120.0
+DEFAULT_JITTER = 0.5
+DEFAULT_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+class RetryPolicy:
+    """Decides if and when a failed request gets sent again.
+
+    Failed attempts are retried with an exponential backoff starting at
+    base_delay and capped at max_delay. Every delay gets randomized by up to
+    +/- jitter (a fraction of the delay) so parallel workers do not retry in
+    lockstep. A Retry-After header of the server wins over the backoff, but if
+    it asks to wait longer than max_retry_after the request is not retried.
+    Only GET requests are retried unless retry_post is set as uploads are not
+    guaranteed to be idempotent.
+
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, jitter=DEFAULT_JITTER, status_codes=None, retry_post=False, max_retry_after=DEFAULT_MAX_RETRY_AFTER):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.jitter = jitter
+        self.status_codes = DEFAULT_STATUS_CODES if status_codes is None else status_codes
+        self.retry_post = retry_post
+
+    def canRetry(self, method, attempt):
+        """Returns if another attempt is allowed after the given (1 based) attempt failed."""
+        if attempt >= self.max_attempts:
+            return False
+        return method == 'GET' or self.retry_post
+
+    def retriesStatus(self, status_code):
+        return status_code in self.status_codes
+
+    def getDelay(self, attempt, retry_after=None):
+        """Returns the seconds to wait after the given (1 based) attempt failed.
+
+        Args:
+            attempt: Number of the failed attempt.
+            retry_after: Value of the Retry-After response header if any.
+
+        Returns:
+            The delay in seconds or None if the server asked to wait longer
+            than max_retry_after and the request should not be retried.
+
+        """
+        server_delay = parseRetryAfter(retry_after)
+        if server_delay is not None:
+            if server_delay > self.max_retry_after:
+                return None
+            return server_delay
+
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = delay * (1 + random.uniform(-self.jitter, self.jitter))
+        return max(0.0, min(self.max_delay, delay))
+
+
+def parseRetryAfter(value):
+    """Converts a Retry-After header (seconds or HTTP date) to seconds or None if not parseable."""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    # Only needed for the rare date form, importing it takes longer than the rest of the module
+    from email.utils import parsedate_to_datetime
+
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_date is None:
+        return None
+
+    return max(0.0, retry_date.timestamp() - time.time())
+
+
+def validateConfig(retry_config):
+    """Checks the retry block of the config file.
+
+    Returns:
+        An error message or None if the block is valid.
+
+    """
+    if not isinstance(retry_config, dict):
+        return 'The retry property has to be an object.'
+
+    for key in retry_config:
+        if key not in ['max_attempts', 'base_delay', 'max_delay', 'max_retry_after', 'jitter', 'status_codes', 'retry_post']:
+            return 'The retry property does not support "%s".' % key
+
+    if 'max_attempts' in retry_config:
+        value = retry_config['max_attempts']
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            return 'The retry property max_attempts has to be a positive number.'
+
+    for key in ['base_delay', 'max_delay', 'max_retry_after', 'jitter']:
+        if key in retry_config:
+            value = retry_config[key]
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                return 'The retry property %s has to be a non-negative number.' % key
+
+    if 'jitter' in retry_config and retry_config['jitter'] > 1:
+        return 'The retry property jitter has to be between 0 and 1.'
+
+    if 'status_codes' in retry_config:
+        value = retry_config['status_codes']
+        if not isinstance(value, list) or not all(isinstance(code, int) and not isinstance(code, bool) for code in value):
+            return 'The retry property status_codes has to be a list of HTTP status codes.'
+
+    if 'retry_post' in retry_config and not isinstance(retry_config['retry_post'], bool):
+        return 'The retry property retry_post has to be true or false.'
+
+    return None
+
+
+def getPolicy(ctx, config_file_data=None):
+    """Returns the retry policy from the retry block of the config file.
+
+    The --max-attempts option of the command line wins over the config file.
+
+    Args:
+        ctx: click context
+        config_file_data: The config file data or None if not available.
+
+    """
+    retry_config = {}
+    if config_file_data and 'retry' in config_file_data['app']:
+        retry_config = dict(config_file_data['app']['retry'])
+
+    if ctx.obj.get('max-attempts'):
+        retry_config['max_attempts'] = ctx.obj['max-attempts']
+
+    return RetryPolicy(**retry_config)
@@ -0,0 +1,110 @@
+import hashlib
+import json
+
+import click
+
+SHARD_BY = ['count', 'size']
+
+
+class ShardParamType(click.ParamType):
+    """Click type of --shard. Converts "i/N" to the tuple (i, N), i counts from 1."""
+
+    name = 'i/N'
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, tuple):
+            return value
+
+        try:
+            index, count = [int(part) for part in value.split('/')]
+        except ValueError:
+            self.fail('%r is no shard like 1/4' % value, param, ctx)
+
+        if count < 1 or index < 1 or index > count:
+            self.fail('%r is no shard, it has to be between 1/N and N/N' % value, param, ctx)
+
+        return index, count
+
+
+SHARD = ShardParamType()
+
+
+class ShardSizesParamType(click.ParamType):
+    """Click type of --shard-sizes. Reads the sizes of the files from a plan written by pull --plan.
+
+    Converts the path of the plan to a dict of (target path, language) to the
+    recorded size, None where no size was recorded.
+
+    """
+
+    name = 'file'
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, dict):
+            return value
+
+        try:
+            with open(value, 'r') as plan_file:
+                plan = json.load(plan_file)
+            return dict(((item['target'], item['language']), item.get('recorded_size')) for item in plan['items'] if 'error' not in item)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.fail('%s is no plan written by pull --plan: %s' % (value, e), param, ctx)
+
+
+SHARD_SIZES = ShardSizesParamType()
+
+
+def getHash(key):
+    """Returns a hash of the key which is the same on every machine and in every run."""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def selectItems(items, shard, getKey, getSize=None):
+    """Returns the work items one shard of a run handles.
+
+    The items are ordered by the hash of their key and then dealt out to the
+    shards in turns, so every shard gets the same number of items give or
+    take one. With getSize the biggest items are dealt out first, each to the
+    shard with the least bytes so far. All shards of a run have to see the
+    same items and sizes, then every item is handled by exactly one shard.
+
+    Args:
+        items: List of all work items of the run.
+        shard: Tuple of (index, count) as converted by SHARD, None for all items.
+        getKey: Function which returns the key of an item as string.
+        getSize: Function which returns the size of an item or None if it is unknown.
+            Unknown sizes count as the average of the known ones.
+
+    Returns:
+        The items of the shard in their original order.
+
+    """
+    if shard is None:
+        return list(items)
+
+    index, count = shard
+    ranked = sorted(range(len(items)), key=lambda position: getHash(getKey(items[position])))
+
+    if getSize is None:
+        selected = set(ranked[index - 1::count])
+    else:
+        sizes = [getSize(item) for item in items]
+        known = [size for size in sizes if size is not None]
+        default_size = float(sum(known)) / len(known) if known else 1
+        sizes = [default_size if size is None else size for size in sizes]
+
+        loads = [0] * count
+        selected = set()
+        # The sort is stable so items of the same size stay in the order of their hash
+        for position in sorted(ranked, key=lambda position: -sizes[position]):
+            target = min(range(count), key=lambda shard_index: (loads[shard_index], shard_index))
+            loads[target] += sizes[position]
+            if target == index - 1:
+                selected.add(position)
+
+    return [item for position, item in enumerate(items) if position in selected]
+
+
+def getDescription(shard, selected, total):
+    """Returns the line which tells how much of the work the shard got."""
+    return 'Shard %d/%d: %d of %d files' % (shard[0], shard[1], selected, total)
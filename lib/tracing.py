@@ -0,0 +1,301 @@
+import functools
+import json
+import os
+import threading
+import time
+
+from lib import constants
+
+SERVICE_NAME = 'applanga-cli'
+
+# Span kinds and status codes as defined by OpenTelemetry
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Active Tracer, None while tracing is off so spans cost only this check
+_tracer = None
+
+
+class Tracer:
+    """Writes the spans of a run to a file, one OpenTelemetry JSON line per span.
+
+    Every line is an export request in the OTLP JSON encoding with a single
+    span, like the file exporter of the OpenTelemetry Collector writes them.
+    All spans of a run share the same trace id.
+
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.trace_id = os.urandom(16).hex()
+        self.root = None
+        self._file = open(file_path, 'w')
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._open_spans = set()
+
+    def getStack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def getCurrentSpan(self):
+        """Returns the innermost span entered in this thread, the root span in threads without one."""
+        stack = self.getStack()
+        if stack:
+            return stack[-1]
+        return self.root
+
+    def startSpan(self, name, attributes=None, parent=None, kind=KIND_INTERNAL):
+        if parent is None:
+            parent = self.getCurrentSpan()
+        span = Span(self, name, parent, attributes, kind)
+        with self._lock:
+            self._open_spans.add(span)
+        return span
+
+    def export(self, span):
+        line = json.dumps({
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': getAttributes({
+                        'service.name': SERVICE_NAME,
+                        'service.version': constants.VERSION_NUMBER
+                    })
+                },
+                'scopeSpans': [{
+                    'scope': {'name': SERVICE_NAME, 'version': constants.VERSION_NUMBER},
+                    'spans': [span.getData()]
+                }]
+            }]
+        })
+        with self._lock:
+            self._open_spans.discard(span)
+            if not self._file.closed:
+                self._file.write(line + '\n')
+
+    def stop(self):
+        """Ends the spans which are still open, e.g. after an aborted run, and closes the file."""
+        with self._lock:
+            open_spans = sorted(self._open_spans, key=lambda span: span.start_time, reverse=True)
+        for span in open_spans:
+            if span is not self.root and not span.ended:
+                span.setError('The run ended before the span')
+                span.end(force=True)
+        if self.root is not None:
+            self.root.end(force=True)
+        with self._lock:
+            self._file.close()
+
+
+class Span:
+    """A timed operation of the run with attributes.
+
+    A span gets exported when it ends. Spans which are held by parallel jobs,
+    like the target of several language downloads, only end once every hold
+    got released.
+
+    """
+
+    def __init__(self, tracer, name, parent, attributes, kind):
+        self._tracer = tracer
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if isinstance(parent, Span) else None
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status_code = STATUS_UNSET
+        self.status_message = None
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self.ended = False
+        self._holds = 1
+        self._lock = threading.Lock()
+
+    def setAttribute(self, key, value):
+        self.attributes[key] = value
+
+    def setAttributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def setError(self, error):
+        """Marks the span as failed with the given exception or message."""
+        self.status_code = STATUS_ERROR
+        self.status_message = str(error)
+        if isinstance(error, BaseException):
+            self.attributes['error.type'] = type(error).__name__
+
+    def hold(self):
+        """Keeps the span open until release gets called as often as hold."""
+        with self._lock:
+            self._holds += 1
+        return self
+
+    def end(self, force=False):
+        """Releases a hold of the span and exports it once no holds are left."""
+        with self._lock:
+            if self.ended:
+                return
+            self._holds = 0 if force else self._holds - 1
+            if self._holds > 0:
+                return
+            self.ended = True
+            self.end_time = time.time_ns()
+        self._tracer.export(self)
+
+    release = end
+
+    def __enter__(self):
+        self._tracer.getStack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stack = self._tracer.getStack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_value is not None and self.status_code != STATUS_ERROR:
+            self.setError(exc_value)
+        self.end()
+        return False
+
+    def getData(self):
+        data = {
+            'traceId': self._tracer.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_time),
+            'endTimeUnixNano': str(self.end_time),
+            'attributes': getAttributes(self.attributes),
+            'status': {'code': self.status_code}
+        }
+        if self.parent_id is not None:
+            data['parentSpanId'] = self.parent_id
+        if self.status_message:
+            data['status']['message'] = self.status_message
+        return data
+
+
+class NoSpan:
+    """Stands in for Span while tracing is off."""
+
+    def setAttribute(self, key, value):
+        pass
+
+    def setAttributes(self, attributes):
+        pass
+
+    def setError(self, error):
+        pass
+
+    def hold(self):
+        return self
+
+    def end(self, force=False):
+        pass
+
+    release = end
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_SPAN = NoSpan()
+
+
+def span(name, attributes=None, parent=None, kind=KIND_INTERNAL):
+    """Returns a span which is the current span of the thread while it is used as context manager.
+
+    Args:
+        name: Name of the span.
+        attributes: Dict of attributes, values can be strings, numbers, booleans or lists of them.
+        parent: Parent span. By default the current span of the thread.
+        kind: KIND_INTERNAL or KIND_CLIENT for requests.
+
+    Returns:
+        A Span, it ends when the with block is left. Exceptions leaving the
+        block mark it as failed.
+
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.startSpan(name, attributes, parent, kind)
+
+
+def traced(name):
+    """Decorator which records every call of the function as span."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _tracer.startSpan(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def startSpan(name, attributes=None, parent=None, kind=KIND_INTERNAL):
+    """Starts a span which does not become the current span of the thread. It has to be ended with end."""
+    return span(name, attributes, parent, kind)
+
+
+def isEnabled():
+    return _tracer is not None
+
+
+def getCurrentSpan():
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.getCurrentSpan()
+
+
+def getAttributes(attributes):
+    return [{'key': key, 'value': getAttributeValue(value)} for key, value in sorted(attributes.items()) if value is not None]
+
+
+def getAttributeValue(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        # Integers are strings in the JSON encoding of OTLP
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, (list, tuple)):
+        return {'arrayValue': {'values': [getAttributeValue(item) for item in value]}}
+    return {'stringValue': str(value)}
+
+
+def start(file_path, command_name, attributes=None):
+    """Starts to record the spans of the run.
+
+    Args:
+        file_path: File to write the spans to as JSON lines.
+        command_name: Name of the root span, the command which gets run.
+        attributes: Attributes of the root span.
+
+    Returns:
+        The started Tracer, call stop at the end of the run.
+
+    """
+    global _tracer
+    tracer = Tracer(file_path)
+    tracer.root = tracer.startSpan(command_name, attributes)
+    _tracer = tracer
+    return tracer
+
+
+def stop():
+    global _tracer
+    tracer = _tracer
+    _tracer = None
+    if tracer is not None:
+        tracer.stop()
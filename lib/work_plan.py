@@ -0,0 +1,130 @@
+import json
+
+from lib import api
+from lib import lock_file
+
+# Keys of the upload data which are listed on their own in a plan item
+UPLOAD_ITEM_KEYS = ['path', 'language', 'tag', 'file_format']
+
+
+def getPullPlan(downloads, lock=None, force=False, project_version=None):
+    """Resolves the downloads of a pull without downloading anything.
+
+    The files are resolved with api.getDownloadState like in the real pull so
+    the paths include languageMap and the naming rules of the file formats.
+
+    Args:
+        downloads: The downloads of the pull, one per target and language.
+        lock: LockFile with the state of previous downloads or None.
+        force: if true all files count as changed like with --full
+        project_version: Version of the project the plan is for.
+
+    Returns:
+        The plan as dict with one item per download.
+
+    """
+    items = []
+    for file_data in downloads:
+        item = {
+            'target': file_data.get('path'),
+            'language': file_data.get('language')
+        }
+        if 'error' in file_data:
+            # Target block which can not be downloaded, see pull.iter_download_jobs
+            item['error'] = file_data['error']
+            items.append(item)
+            continue
+
+        try:
+            request_data, file_path, request_key, lock_entry = api.getDownloadState(file_data, lock, force)
+        except api.ApplangaRequestException as e:
+            item['error'] = str(e)
+            items.append(item)
+            continue
+
+        item['path'] = file_path
+        item['file_format'] = request_data['file-format']
+        item['tag'] = request_data.get('tag')
+        item['request'] = dict((key, value) for key, value in request_data.items() if key not in ['language', 'file-format', 'tag', 'version'])
+        item['request']['options'] = json.loads(request_data['options'])
+        item['unchanged'] = bool(lock_entry) and lock_entry.get('projectVersion') == request_data['version']
+        item['recorded_size'] = lock_file.getRecordedSize(lock, 'pull', file_path)
+        items.append(item)
+
+    return {
+        'command': 'pull',
+        'projectVersion': project_version,
+        'items': items,
+        'summary': getSummary(items)
+    }
+
+
+def getPushPlan(blocks, errors, lock=None, incremental=False, force=False, draft=False, shard=None, shard_by='count'):
+    """Lists the uploads of a push without uploading anything.
+
+    Args:
+        blocks: The blocks with their files as returned by api.findUploadFiles.
+        errors: The errors of the blocks as returned by api.findUploadFiles.
+        lock: LockFile with the state of previous uploads or None.
+        incremental: if true files which did not change since their last upload count as unchanged
+        force: the --force option of the push, part of the upload options
+        draft: the --draft option of the push, part of the upload options
+        shard: Tuple of (index, count) to only list the files of one shard.
+        shard_by: How the files are balanced between the shards, see api.selectUploadShard.
+
+    Returns:
+        The plan as dict with one item per file.
+
+    """
+    items = [{'block': error['path'], 'error': error['error']} for error in errors]
+    skipped = []
+    uploads = []
+    for source, language_files in blocks:
+        skipped += language_files.get('skipped', [])
+        uploads += [(file_path, file_data, source) for file_path, file_data in language_files['found'].items()]
+
+    selected = api.selectUploadShard(uploads, shard, shard_by)
+    for file_path, file_data, source in selected:
+        item = {
+            'block': source['path'],
+            'path': file_path,
+            'language': file_data['language']
+        }
+        if 'file_format' not in file_data:
+            item['error'] = 'Request is incomplete. The file_format is missing.'
+            items.append(item)
+            continue
+
+        send_data = api.getUploadData(file_path, file_data)
+        item['file_format'] = send_data['file_format']
+        item['tag'] = send_data.get('tag')
+        item['options'] = dict((key, value) for key, value in send_data.items() if key not in UPLOAD_ITEM_KEYS)
+        item['options'].update({'force': force, 'draft': draft})
+        item['size'] = api.getFileSize(file_path)
+
+        lock_entry = lock.get('push', api.getUploadLockKey(send_data, force, draft)) if lock is not None else None
+        item['unchanged'] = bool(incremental and lock_file.fileMatches(lock_entry, file_path))
+        items.append(item)
+
+    plan = {
+        'command': 'push',
+        'items': items,
+        'skipped': skipped,
+        'summary': getSummary(items)
+    }
+    if shard is not None:
+        plan['shard'] = getShardInfo(shard, len(uploads))
+    return plan
+
+
+def getShardInfo(shard, total):
+    """Returns which shard a plan is for and how many items all shards have together."""
+    return {'index': shard[0], 'count': shard[1], 'total_items': total}
+
+
+def getSummary(items):
+    return {
+        'items': len(items),
+        'errors': len([item for item in items if 'error' in item]),
+        'unchanged': len([item for item in items if item.get('unchanged')])
+    }
@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+
+DEFAULT_JOBS = 1
+
+
+def getJobCount(jobs, config_block):
+    """Returns the number of parallel workers to use.
+
+    Args:
+        jobs: Value given via the --jobs option or None if not set.
+        config_block: The push or pull block of the config file.
+
+    Returns:
+        The number of workers. The command line option wins over the config file.
+
+    """
+    if jobs:
+        return jobs
+
+    if config_block and 'jobs' in config_block:
+        return config_block['jobs']
+
+    return DEFAULT_JOBS
+
+
+def runOrdered(worker, items, jobs=DEFAULT_JOBS):
+    """Runs worker for all items with a bounded pool of threads.
+
+    Results are yielded in the order of the given items no matter in which
+    order they finish, so that the console output stays readable. Only a
+    limited number of items is scheduled ahead so memory does not grow with
+    the number of items. If the consumer stops iterating (e.g. on an error)
+    all items which did not start yet get cancelled.
+
+    Args:
+        worker: Function that gets called with a single item.
+        items: The items to process.
+        jobs: Maximum number of items processed at the same time.
+
+    Yields:
+        Tuples of (item, result, exception). Either result or exception is None.
+
+    """
+    if jobs <= 1:
+        for item in items:
+            try:
+                yield item, worker(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    pending = deque()
+    items = iter(items)
+
+    def schedule():
+        # Keep a few more items queued than workers exist so workers never idle
+        while len(pending) < jobs * 2:
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            pending.append((item, executor.submit(worker, item)))
+
+    try:
+        schedule()
+        while pending:
+            item, future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                yield item, None, e
+            else:
+                yield item, result, None
+            schedule()
+    finally:
+        for item, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
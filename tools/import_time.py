@@ -0,0 +1,122 @@
+"""Benchmark of the start of the CLI for CI.
+
+Runs light invocations of the CLI, like --version or config, several times
+with python -X importtime in a fresh process each and reports the time spent
+importing modules. It fails if one of the invocations imports a module which
+only commands talking to the API need (requests, urllib3, glob2) or if the
+median import time is above the given budget.
+
+    python tools/import_time.py
+    python tools/import_time.py --runs 10 --max-ms 150 --json
+
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'applanga.py')
+
+# Invocations which must not load what is only needed to talk to the API
+INVOCATIONS = [
+    ['--version'],
+    ['--help'],
+    ['config'],
+    ['pull', '--help']
+]
+
+# Modules which are only imported on first use, see lib/lazy_group.py
+DEFERRED_MODULES = ['requests', 'urllib3', 'glob2']
+
+
+def measureImports(args, cwd):
+    """Runs the CLI once with -X importtime.
+
+    Args:
+        args: Arguments for the CLI.
+        cwd: Folder to run the CLI in.
+
+    Returns:
+        Tuple of the total import time in milliseconds and the set of the
+        imported top level packages.
+
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(CLI_PATH)] + args, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError('applanga %s failed:\n%s' % (' '.join(args), result.stderr.decode('utf-8', 'replace')))
+
+    total_us = 0
+    packages = set()
+    for line in result.stderr.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The header of the table
+            continue
+        total_us += int(fields[0])
+        packages.add(fields[2].strip().split('.')[0])
+
+    return total_us / 1000.0, packages
+
+
+def getMedian(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the import time of light CLI invocations and fails if deferred modules get imported.')
+    parser.add_argument('--runs', type=int, default=5, help='Number of runs per invocation (default 5).')
+    parser.add_argument('--max-ms', type=float, default=None, help='Fail if the median import time of an invocation is above this many milliseconds.')
+    parser.add_argument('--json', dest='json_output', action='store_true', help='Print the report as JSON.')
+    args = parser.parse_args()
+
+    # Outside of any project so config does not find a config file
+    work_dir = tempfile.mkdtemp(prefix='applanga-import-time-')
+    report = []
+    failed = False
+    try:
+        for invocation in INVOCATIONS:
+            times = []
+            deferred = set()
+            for run in range(args.runs):
+                milliseconds, packages = measureImports(invocation, work_dir)
+                times.append(milliseconds)
+                deferred.update(packages.intersection(DEFERRED_MODULES))
+
+            median = getMedian(times)
+            over_budget = args.max_ms is not None and median > args.max_ms
+            failed = failed or over_budget or bool(deferred)
+            report.append({
+                'invocation': ' '.join(invocation),
+                'median_ms': median,
+                'min_ms': min(times),
+                'max_ms': max(times),
+                'deferred_modules_imported': sorted(deferred),
+                'over_budget': over_budget
+            })
+    finally:
+        os.rmdir(work_dir)
+
+    if args.json_output:
+        print(json.dumps({'max_ms': args.max_ms, 'invocations': report, 'failed': failed}, indent=2))
+    else:
+        for entry in report:
+            problems = []
+            if entry['deferred_modules_imported']:
+                problems.append('imports %s' % ', '.join(entry['deferred_modules_imported']))
+            if entry['over_budget']:
+                problems.append('over budget of %g ms' % args.max_ms)
+            print('%-14s median %7.1f ms  min %7.1f ms  max %7.1f ms  %s' % (entry['invocation'], entry['median_ms'], entry['min_ms'], entry['max_ms'], '; '.join(problems) or 'ok'))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""Load harness which runs the CLI against the stand-in server.
+
+It creates a project with the given number of push and pull blocks in a
+temporary folder, starts tools/stand_in_server.py in the background (or uses
+a running server given with --server) and runs the CLI command several times
+with APPLANGA_API_HOST pointing to it. At the end it reports the duration of
+the runs, the throughput and the latency percentiles of the requests the
+server answered.
+
+    python tools/load_test.py pull --runs 5 --targets 20 --languages 20 --latency 0.05 --jobs 8
+    python tools/load_test.py push --runs 3 --error-rate 0.1 --global-args="--max-attempts 5"
+    python tools/load_test.py pull --drop-rate 0.05 --cli-args=--bulk --app-config '{"rate_limit": {"download": {"rps": 20}}}'
+
+"""
+import argparse
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import stand_in_server
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'applanga.py')
+
+# Any token works for the stand-in server
+ACCESS_TOKEN = 'standin!token'
+
+
+def createProject(project_dir, targets, sources, entries, app_config=None):
+    """Writes the config file and the source files of the load test project.
+
+    Args:
+        project_dir: Folder to create the project in.
+        targets: Number of pull blocks, each pulls all languages.
+        sources: Number of push blocks, each with one source file.
+        entries: Number of entries per source file.
+        app_config: Additional properties of the app block.
+
+    """
+    config = {
+        'app': {
+            'access_token': ACCESS_TOKEN,
+            'pull': {
+                'target': [{
+                    'file_format': 'nested_json',
+                    'path': './target_%d/<language>.json' % i,
+                    'tag': 'target_%d' % i
+                } for i in range(targets)]
+            },
+            'push': {
+                'source': [{
+                    'file_format': 'nested_json',
+                    'language': 'en',
+                    'path': './source_%d/en.json' % i,
+                    'tag': 'source_%d' % i
+                } for i in range(sources)]
+            }
+        }
+    }
+    config['app'].update(app_config or {})
+    with open(os.path.join(project_dir, '.applanga.json'), 'w') as config_file:
+        json.dump(config, config_file, indent=2)
+
+    for i in range(sources):
+        source_dir = os.path.join(project_dir, 'source_%d' % i)
+        os.makedirs(source_dir, exist_ok=True)
+        with open(os.path.join(source_dir, 'en.json'), 'w') as source_file:
+            json.dump(dict(('source_%d_entry_%d' % (i, j), 'Value %d' % j) for j in range(entries)), source_file, indent=2)
+
+
+def resetProject(project_dir):
+    """Removes the downloaded files and the lock file so the next run starts cold."""
+    for name in os.listdir(project_dir):
+        path = os.path.join(project_dir, name)
+        if name.startswith('target_'):
+            shutil.rmtree(path)
+        elif name == '.applanga.lock':
+            os.remove(path)
+
+
+def requestStats(server_url, method='GET'):
+    request = urllib.request.Request(server_url + stand_in_server.STATS_PATH, method=method, data=b'' if method == 'POST' else None)
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def runCommand(project_dir, server_url, global_args, command, cli_args, show_output):
+    """Runs the CLI once and returns its exit code and the seconds it took."""
+    env = dict(os.environ)
+    env['APPLANGA_API_HOST'] = server_url
+    env.setdefault('APPLANGA_CACHE_DIR', 'off')
+
+    args = [sys.executable, os.path.abspath(CLI_PATH)] + global_args + [command] + cli_args
+    started = time.monotonic()
+    result = subprocess.run(args, cwd=project_dir, env=env, stdout=None if show_output else subprocess.DEVNULL, stderr=None if show_output else subprocess.PIPE)
+    seconds = time.monotonic() - started
+
+    if result.returncode != 0 and not show_output and result.stderr:
+        sys.stderr.write(result.stderr.decode('utf-8', 'replace'))
+
+    return result.returncode, seconds
+
+
+def getPercentile(values, percentile):
+    """Returns the nearest-rank percentile of the values or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(percentile / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def formatSeconds(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 1:
+        return '%.1f ms' % (seconds * 1000)
+    return '%.2f s' % seconds
+
+
+def getReport(runs):
+    """Sums up the runs.
+
+    Args:
+        runs: List of dicts with the exit code, seconds and server stats of every run.
+
+    Returns:
+        Dict with the report data.
+
+    """
+    durations = [duration for run in runs for duration in run['stats']['durations']]
+    seconds = [run['seconds'] for run in runs]
+    total_seconds = sum(seconds)
+
+    requests = {}
+    faults = {}
+    files = 0
+    bytes_total = 0
+    for run in runs:
+        for key, count in run['stats']['requests'].items():
+            requests[key] = requests.get(key, 0) + count
+        files += run['stats']['files']
+        for key, count in run['stats']['faults'].items():
+            faults[key] = faults.get(key, 0) + count
+        bytes_total += run['stats']['bytes_sent'] + run['stats']['bytes_received']
+
+    return {
+        'runs': len(runs),
+        'failed_runs': len([run for run in runs if run['exit_code'] != 0]),
+        'run_seconds': {
+            'min': min(seconds),
+            'p50': getPercentile(seconds, 50),
+            'p95': getPercentile(seconds, 95),
+            'max': max(seconds)
+        },
+        'requests': sum(requests.values()),
+        'requests_per_second': sum(requests.values()) / total_seconds if total_seconds else None,
+        'files_per_second': files / total_seconds if total_seconds else None,
+        'bytes_per_second': bytes_total / total_seconds if total_seconds else None,
+        'request_latency': {
+            'p50': getPercentile(durations, 50),
+            'p90': getPercentile(durations, 90),
+            'p99': getPercentile(durations, 99),
+            'max': max(durations) if durations else None
+        },
+        'responses': requests,
+        'faults': faults
+    }
+
+
+def printReport(report):
+    print('\nRuns:              %d (%d failed)' % (report['runs'], report['failed_runs']))
+    print('Run time:          min %s, p50 %s, p95 %s, max %s' % tuple(formatSeconds(report['run_seconds'][key]) for key in ['min', 'p50', 'p95', 'max']))
+    print('Requests:          %d (%.1f/s)' % (report['requests'], report['requests_per_second'] or 0))
+    print('Files:             %.1f/s' % (report['files_per_second'] or 0))
+    print('Transferred:       %.1f KB/s' % ((report['bytes_per_second'] or 0) / 1024))
+    print('Request latency:   p50 %s, p90 %s, p99 %s, max %s' % tuple(formatSeconds(report['request_latency'][key]) for key in ['p50', 'p90', 'p99', 'max']))
+    print('Responses:')
+    for key in sorted(report['responses']):
+        print('  %-22s %d' % (key, report['responses'][key]))
+    if report['faults']:
+        print('Injected faults:')
+        for key in sorted(report['faults']):
+            print('  %-22s %d' % (key, report['faults'][key]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the CLI against the stand-in Applanga API and reports throughput and latency.')
+    parser.add_argument('command', choices=['pull', 'push', 'sync', 'pullsource', 'pushtarget'], help='CLI command to run.')
+    parser.add_argument('--runs', type=int, default=3, help='Number of times the command gets run (default 3).')
+    parser.add_argument('--targets', type=int, default=10, help='Number of pull blocks (default 10).')
+    parser.add_argument('--sources', type=int, default=10, help='Number of push blocks (default 10).')
+    parser.add_argument('--jobs', type=int, default=None, help='Passed to the CLI as --jobs.')
+    parser.add_argument('--cli-args', default='', help='Additional arguments for the CLI command, e.g. --cli-args=--bulk.')
+    parser.add_argument('--global-args', default='', help='Arguments for the CLI before the command, e.g. --global-args="--max-attempts 5".')
+    parser.add_argument('--app-config', type=json.loads, default=None, help='JSON object with additional properties of the app block of the config file, e.g. retry or rate_limit.')
+    parser.add_argument('--warm', action='store_true', help='Keep downloaded files and the lock file between runs.')
+    parser.add_argument('--server', default=None, help='URL of a running stand-in server instead of starting one.')
+    parser.add_argument('--json', dest='json_output', action='store_true', help='Print the report as JSON.')
+    parser.add_argument('--show-output', action='store_true', help='Show the output of the CLI.')
+    stand_in_server.addConfigArguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    server_url = args.server
+    if server_url is None:
+        server = stand_in_server.startServer(stand_in_server.getConfig(args))
+        server_url = server.url
+
+    cli_args = shlex.split(args.cli_args)
+    if args.jobs is not None:
+        cli_args += ['--jobs', str(args.jobs)]
+
+    project_dir = tempfile.mkdtemp(prefix='applanga-load-test-')
+    try:
+        createProject(project_dir, args.targets, args.sources, args.entries, args.app_config)
+
+        runs = []
+        for run in range(args.runs):
+            if not args.warm:
+                resetProject(project_dir)
+            requestStats(server_url, 'POST')
+
+            exit_code, seconds = runCommand(project_dir, server_url, shlex.split(args.global_args), args.command, cli_args, args.show_output)
+            runs.append({'exit_code': exit_code, 'seconds': seconds, 'stats': requestStats(server_url)})
+            if not args.json_output:
+                print('Run %d: %s, exit code %d' % (run + 1, formatSeconds(seconds), exit_code))
+
+        report = getReport(runs)
+        if args.json_output:
+            print(json.dumps(report, indent=2, sort_keys=True))
+        else:
+            printReport(report)
+
+        return 1 if report['failed_runs'] else 0
+    finally:
+        shutil.rmtree(project_dir, ignore_errors=True)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
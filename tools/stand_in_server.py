@@ -0,0 +1,397 @@
+"""Local stand-in for the parts of Applanga API the CLI uses.
+
+It serves a synthetic project so the network paths of the CLI can be measured
+and tested without the live API. Latency, bandwidth, rate limit and server
+error responses and dropped connections can be injected.
+
+Run it and point the CLI to it with the APPLANGA_API_HOST environment variable:
+
+    python tools/stand_in_server.py --port 8765 --languages 20 --latency 0.05
+    APPLANGA_API_HOST=http://127.0.0.1:8765 python applanga.py pull
+
+Any access token of the form "<app id>!<secret>" is accepted. The numbers of
+requests, injected faults and the request durations can be read from
+GET /__stats and reset with POST /__stats.
+
+"""
+import argparse
+import hashlib
+import io
+import json
+import random
+import sys
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_BASE_PATH = '/v1/api'
+STATS_PATH = '/__stats'
+
+# Language codes the synthetic projects use, the first one is the base language
+LANGUAGE_CODES = [
+    'en', 'de', 'fr', 'es', 'it', 'nl', 'pt-BR', 'pt-PT', 'sv', 'da', 'nb-NO', 'fi', 'pl', 'cs', 'sk', 'hu',
+    'ro', 'bg', 'el', 'tr', 'ru', 'uk', 'he', 'ar', 'hi', 'th', 'vi', 'id', 'ms', 'ja', 'ko', 'zh-Hans',
+    'zh-Hant', 'zh-Hant-HK', 'en-GB', 'en-AU', 'es-MX', 'fr-CA', 'de-AT', 'de-CH'
+]
+
+# Size of the pieces a throttled body is sent in per second, see StandInHandler.sendBody
+BANDWIDTH_STEPS_PER_SECOND = 20
+
+
+class StandInConfig:
+    """The synthetic project and the faults the server injects."""
+
+    def __init__(self, languages=8, entries=100, value_size=20, version=1, latency=0.0, jitter=0.0,
+                 bandwidth=None, throttle_rate=0.0, error_rate=0.0, drop_rate=0.0, retry_after=1,
+                 bulk=True, seed=None):
+        """
+        Args:
+            languages: Number of languages of the project.
+            entries: Number of entries per downloaded file.
+            value_size: Length of every translated value.
+            version: Project version, incremented with every upload.
+            latency: Seconds every request waits before it gets answered.
+            jitter: Maximum random seconds added to the latency.
+            bandwidth: Maximum bytes per second a response body is sent with or None for no limit.
+            throttle_rate: Share of requests answered with status 429.
+            error_rate: Share of requests answered with status 500, 502 or 503.
+            drop_rate: Share of requests whose connection gets closed without answer.
+            retry_after: Value of the Retry-After header of injected 429 and 503 responses.
+            bulk: If the /files/bulk endpoint is available.
+            seed: Seed for the injected faults to make runs repeatable.
+        """
+        if languages > len(LANGUAGE_CODES):
+            raise ValueError('At most %d languages are supported.' % len(LANGUAGE_CODES))
+
+        self.languages = LANGUAGE_CODES[:languages]
+        self.entries = entries
+        self.value_size = value_size
+        self.version = version
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.retry_after = retry_after
+        self.bulk = bulk
+        self.random = random.Random(seed)
+
+
+class StandInStats:
+    """Counts what the server answered. Shared by all request threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.requests = {}
+            self.faults = {}
+            self.durations = []
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.files = 0
+
+    def record(self, endpoint, status, duration, bytes_sent=0, bytes_received=0, files=0):
+        with self._lock:
+            key = '%s %s' % (endpoint, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.durations.append(duration)
+            self.files += files
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+
+    def recordFault(self, fault):
+        with self._lock:
+            self.faults[fault] = self.faults.get(fault, 0) + 1
+
+    def toDict(self):
+        with self._lock:
+            return {
+                'seconds': time.time() - self.started,
+                'requests': dict(self.requests),
+                'faults': dict(self.faults),
+                'durations': list(self.durations),
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'files': self.files
+            }
+
+
+class StandInServer(ThreadingHTTPServer):
+    """HTTP server which answers like Applanga API from a StandInConfig."""
+
+    daemon_threads = True
+
+    def __init__(self, address, config, verbose=False):
+        super().__init__(address, StandInHandler)
+        self.config = config
+        self.verbose = verbose
+        self.stats = StandInStats()
+        self.version_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep connections open like the API so the connection pool of the CLI gets used
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write('%s %s\n' % (self.log_date_time_string(), format % args))
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self):
+        started = time.monotonic()
+        url = urlparse(self.path)
+        query = dict((key, values[-1]) for key, values in parse_qs(url.query).items())
+
+        body = b''
+        if self.headers.get('Content-Length'):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+
+        if url.path == STATS_PATH:
+            if self.command == 'POST':
+                self.server.stats.reset()
+            return self.sendJson(200, self.server.stats.toDict())
+
+        # Number of files downloaded or uploaded with the request, set by answer
+        self.files = 0
+        endpoint = self.getEndpoint(url.path)
+        status, sent = self.answer(endpoint, query, body)
+        self.server.stats.record(endpoint, status, time.monotonic() - started, sent, len(body), self.files)
+
+    def getEndpoint(self, path):
+        if path.startswith('/v1/projects/') and path.endswith('/updateSettings'):
+            return 'updateSettings'
+        if path == API_BASE_PATH:
+            return 'languages'
+        if path == API_BASE_PATH + '/projectVersion':
+            return 'projectVersion'
+        if path == API_BASE_PATH + '/files':
+            return 'upload' if self.command == 'POST' else 'download'
+        if path == API_BASE_PATH + '/files/bulk':
+            return 'bulk'
+        return 'unknown'
+
+    def answer(self, endpoint, query, body):
+        """Sends the response of a request, including injected faults.
+
+        Returns:
+            Tuple of the status code and the number of body bytes sent.
+
+        """
+        config = self.server.config
+
+        delay = config.latency + config.random.uniform(0, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        fault = self.getFault()
+        if fault == 'drop':
+            # Close the connection without any answer like a failing proxy would
+            self.close_connection = True
+            return 'dropped', 0
+        if fault is not None:
+            return fault, self.sendJson(fault, {'message': 'Injected status %d' % fault}, retry_after=True)
+
+        authorization = self.headers.get('Authorization', '')
+        if not authorization.startswith('Bearer ') or '!' not in authorization:
+            return 403, self.sendJson(403, {'message': 'Invalid access token'})
+
+        if endpoint == 'languages':
+            data = dict((language, {}) for language in config.languages)
+            return 200, self.sendJson(200, {'name': 'Stand-in project', 'baseLanguage': config.languages[0], 'data': data})
+
+        if endpoint == 'projectVersion':
+            return 200, self.sendJson(200, {'appVersion': config.version})
+
+        if endpoint == 'download':
+            language = query.get('language')
+            if language not in config.languages:
+                return 400, self.sendJson(400, {'message': 'Language "%s" does not exist' % language})
+
+            content = self.getFileContent(language, query)
+            self.files = 1
+            etag = '"%s"' % hashlib.md5(content).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                return 304, self.sendBody(304, b'', headers={'ETag': etag})
+            return 200, self.sendBody(200, content, headers={'ETag': etag})
+
+        if endpoint == 'bulk':
+            if not config.bulk:
+                return 404, self.sendJson(404, {'message': 'Not found'})
+            archive = self.getArchive(query)
+            return 200, self.sendBody(200, archive, 'application/zip')
+
+        if endpoint == 'upload':
+            with self.server.version_lock:
+                config.version += 1
+            entries = countUploadedEntries(body)
+            self.files = 1
+            return 200, self.sendJson(200, {'total': entries, 'added': entries, 'updated': 0, 'tagUpdates': 0})
+
+        if endpoint == 'updateSettings':
+            return 200, self.sendJson(200, {'update': False})
+
+        return 404, self.sendJson(404, {'message': 'Not found'})
+
+    def getFault(self):
+        """Returns the fault to inject into the current request: 'drop', a status code or None."""
+        config = self.server.config
+        chance = config.random.random()
+
+        for fault, rate in [('drop', config.drop_rate), (429, config.throttle_rate), (None, config.error_rate)]:
+            if chance < rate:
+                if fault is None:
+                    fault = config.random.choice([500, 502, 503])
+                self.server.stats.recordFault(str(fault))
+                return fault
+            chance -= rate
+
+        return None
+
+    def getFileContent(self, language, query):
+        """Returns the synthetic content of a file. It only changes with the project version."""
+        config = self.server.config
+        seed = '%s:%s:%s' % (language, query.get('tag', ''), query.get('version', config.version))
+        value = (hashlib.sha256(seed.encode('utf-8')).hexdigest() * (config.value_size // 64 + 1))[:config.value_size]
+        entries = dict(('entry_%d' % i, '%s %s' % (language, value)) for i in range(config.entries))
+        return json.dumps(entries, indent=2, sort_keys=True).encode('utf-8')
+
+    def getArchive(self, query):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for language in query.get('languages', '').split(','):
+                if language in self.server.config.languages:
+                    zip_file.writestr('%s.json' % language, self.getFileContent(language, query))
+                    self.files += 1
+        return archive.getvalue()
+
+    def sendJson(self, status, data, retry_after=False):
+        headers = {}
+        if retry_after and status in (429, 503):
+            headers['Retry-After'] = str(self.server.config.retry_after)
+        return self.sendBody(status, json.dumps(data).encode('utf-8'), 'application/json', headers)
+
+    def sendBody(self, status, body, content_type='application/json', headers=None):
+        """Sends a response and limits the speed of its body to the configured bandwidth.
+
+        Returns:
+            Number of body bytes sent.
+
+        """
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        bandwidth = self.server.config.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return len(body)
+
+        step = max(1, int(bandwidth / BANDWIDTH_STEPS_PER_SECOND))
+        for position in range(0, len(body), step):
+            self.wfile.write(body[position:position + step])
+            self.wfile.flush()
+            time.sleep(1.0 / BANDWIDTH_STEPS_PER_SECOND)
+        return len(body)
+
+
+def countUploadedEntries(body):
+    """Returns the number of entries of an uploaded JSON file or the number of lines of other files."""
+    head, separator, content = body.partition(b'\r\n\r\n')
+    if not separator:
+        return 0
+
+    # Cut off the closing boundary of the multipart body
+    content = content.rsplit(b'\r\n--', 1)[0]
+    try:
+        data = json.loads(content.decode('utf-8'))
+        if isinstance(data, dict):
+            return len(data)
+    except ValueError:
+        pass
+    return len([line for line in content.splitlines() if line.strip()])
+
+
+def startServer(config, host='127.0.0.1', port=0, verbose=False):
+    """Starts a stand-in server in a background thread.
+
+    Args:
+        config: The StandInConfig to answer with.
+        host: Address to listen on.
+        port: Port to listen on, 0 picks a free one.
+        verbose: if true every request gets logged to stderr.
+
+    Returns:
+        The running StandInServer. Stop it with shutdown().
+
+    """
+    server = StandInServer((host, port), config, verbose)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def addConfigArguments(parser):
+    """Adds the options of StandInConfig to an argparse parser."""
+    parser.add_argument('--languages', type=int, default=8, help='Number of project languages (default 8, at most %d).' % len(LANGUAGE_CODES))
+    parser.add_argument('--entries', type=int, default=100, help='Number of entries per downloaded file (default 100).')
+    parser.add_argument('--value-size', type=int, default=20, help='Length of every value (default 20).')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds every request waits before it gets answered.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Maximum random seconds added to the latency.')
+    parser.add_argument('--bandwidth', type=float, default=None, help='Maximum bytes per second per response body.')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered with 429 (0 to 1).')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 500, 502 or 503 (0 to 1).')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of requests whose connection gets closed (0 to 1).')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After of injected 429 and 503 responses (default 1).')
+    parser.add_argument('--no-bulk', dest='bulk', action='store_false', help='Answer bulk downloads with 404.')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for the injected faults.')
+
+
+def getConfig(args):
+    """Returns the StandInConfig for the parsed options of addConfigArguments."""
+    return StandInConfig(
+        languages=args.languages, entries=args.entries, value_size=args.value_size, latency=args.latency,
+        jitter=args.jitter, bandwidth=args.bandwidth, throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+        drop_rate=args.drop_rate, retry_after=args.retry_after, bulk=args.bulk, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for Applanga API.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default 127.0.0.1).')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default 8765).')
+    parser.add_argument('--verbose', action='store_true', help='Log every request.')
+    addConfigArguments(parser)
+    args = parser.parse_args()
+
+    server = StandInServer((args.host, args.port), getConfig(args), args.verbose)
+    print('Stand-in Applanga API listening on %s' % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()